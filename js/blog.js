@@ -4,12 +4,9 @@ const postsContainer = document.getElementById("posts-container");
 const categoryList = document.getElementById("category-list");
 let postsMeta = [];
 
-// Responsive image manifest (assets/img) — resolves to {} when absent
+// Responsive image manifest slice for the post being shown (assets/img/manifest/
+// shard for its directory, via TbdData) — {} when absent
 let imageManifest = {};
-const imageManifestReady = fetch("assets/img/manifest.json")
-  .then((r) => (r.ok ? r.json() : {}))
-  .catch(() => ({}))
-  .then((m) => { imageManifest = m || {}; });
 
 const POSTS_PER_BATCH = 10;
 
@@ -154,6 +151,8 @@ function renderPosts(category = "all", skipPushState = false) {
   // Search filter
   if (currentSearch.trim()) {
     const searchLower = currentSearch.trim().toLowerCase();
+    const inBody =
+      bodyMatches && bodyMatches.query === currentSearch.trim() ? bodyMatches.files : null;
     filtered = filtered.filter((post) => {
       const title = (post.title || "").toLowerCase();
       const date = (post.date || "").toLowerCase();
@@ -163,7 +162,8 @@ function renderPosts(category = "all", skipPushState = false) {
         title.includes(searchLower) ||
         date.includes(searchLower) ||
         preview.includes(searchLower) ||
-        categories.includes(searchLower)
+        categories.includes(searchLower) ||
+        (inBody !== null && inBody.has(post.filename))
       );
     });
   }
@@ -295,7 +295,12 @@ function renderPosts(category = "all", skipPushState = false) {
   );
 }
 
+// Preview card for the listing. The index carries the preview (generate_posts_index.py
+// builds it exactly as below); only entries from an older index fetch the markdown.
 function fetchMarkdownPreview(post) {
+  if (typeof post.preview === "string") {
+    return Promise.resolve(buildPreviewCard(post, post.preview));
+  }
   return fetch(`posts/${post.filename}`)
     .then((res) => res.text())
     .then((md) => {
@@ -317,47 +322,59 @@ function fetchMarkdownPreview(post) {
         previewText += "...";
 
       post.preview = previewText; // Save preview for search
-
+      return buildPreviewCard(post, previewText);
+    })
+    .catch((err) => {
       const postDiv = document.createElement("div");
-      postDiv.className = "post-preview";
+      postDiv.className = "post post-preview error";
+      postDiv.innerHTML = `<h2 class='post-title'>Error loading post</h2><div>${err}</div>`;
+      return postDiv;
+    });
+}
 
-      const title = post.title || "Untitled";
-      const date = post.date || "Unknown date";
-      const postCategories = getPostCategories(post);
-      const categoriesStr = postCategories.length
-        ? postCategories.map((cat) => capitalize(cat)).join(", ")
-        : "Uncategorized";
+// Card body: pre-rendered by generate_posts_index.py; older index entries show the text as-is
+function previewHTML(post, previewText) {
+  if (typeof post.preview_html === "string") return post.preview_html;
+  const p = document.createElement("p");
+  p.textContent = previewText;
+  return p.outerHTML;
+}
 
-      postDiv.innerHTML = `
+function buildPreviewCard(post, previewText) {
+  const postDiv = document.createElement("div");
+  postDiv.className = "post-preview";
+
+  const title = post.title || "Untitled";
+  const date = post.date || "Unknown date";
+  const postCategories = getPostCategories(post);
+  const categoriesStr = postCategories.length
+    ? postCategories.map((cat) => capitalize(cat)).join(", ")
+    : "Uncategorized";
+  const readingTime = post.reading_minutes ? ` | ${post.reading_minutes} min read` : "";
+
+  postDiv.innerHTML = `
   <div class="post-window">
     <div class="post-toolbar">
       <span>
       <span class="post-window-title">$ ${title}</span><br/>
-      <span class="post-meta">${date.split(" ")[0]} | ${categoriesStr}<span class="view-count hidden"></span></span>
+      <span class="post-meta">${date.split(" ")[0]} | ${categoriesStr}${readingTime}<span class="view-count hidden"></span></span>
       </span>
     </div>
     <div class="post-window-content">
       <div class="post-content" dir="auto">${
-        isCompactMode ? "" : marked.parse(previewText)
+        isCompactMode ? "" : previewHTML(post, previewText)
       }</div>
       ${post.isUnread ? "<div class='unread-notification'>Unread</div>" : ""}
     </div>
   </div>
 `;
 
-      postDiv.style.cursor = "pointer";
-      postDiv.addEventListener("click", () => renderFullPost(post));
-      if (typeof fetchViewCountForPreview === "function") {
-        fetchViewCountForPreview(post.filename, postDiv.querySelector(".view-count"));
-      }
-      return postDiv;
-    })
-    .catch((err) => {
-      const postDiv = document.createElement("div");
-      postDiv.className = "post post-preview error";
-      postDiv.innerHTML = `<h2 class='post-title'>Error loading post</h2><div>${err}</div>`;
-      return postDiv;
-    });
+  postDiv.style.cursor = "pointer";
+  postDiv.addEventListener("click", () => renderFullPost(post));
+  if (typeof fetchViewCountForPreview === "function") {
+    fetchViewCountForPreview(post.filename, postDiv.querySelector(".view-count"));
+  }
+  return postDiv;
 }
 
 // ── Swipe navigation ──────────────────────────────────────────────────────────
@@ -428,6 +445,25 @@ function setupStickyTitle(postDiv, title) {
   postsContainer.addEventListener("scroll", stickyTitleScrollHandler);
 }
 
+// marked is only needed when a post has no pre-rendered fragment, so it is loaded on first use
+let markedLoad = null;
+function loadMarked() {
+  if (window.marked) return Promise.resolve(window.marked);
+  if (!markedLoad) {
+    markedLoad = new Promise((resolve, reject) => {
+      const script = document.createElement("script");
+      script.src = "js/vendor/marked.min.js";
+      script.onload = () => resolve(window.marked);
+      script.onerror = () => {
+        markedLoad = null;
+        reject(new Error("Could not load marked"));
+      };
+      document.head.appendChild(script);
+    });
+  }
+  return markedLoad;
+}
+
 /**
  * Parse markdown to HTML with heading IDs (for TOC links) and table wrappers.
  * Uses DOMParser so it's agnostic to the marked version.
@@ -458,22 +494,26 @@ function parseMarkdownWithIDs(content) {
   return doc.body.innerHTML;
 }
 
-function renderFullPost(post, skipPushState = false) {
-  savedScrollPos = postsContainer.scrollTop;
-  if (!skipPushState) {
-    history.pushState(
-      { post: post.filename },
-      "",
-      `?post=${encodeURIComponent(post.filename)}`
-    );
-  }
-  document.title = post.title
-    ? `${post.title} | Blog | tbd`
-    : `${document.title}`;
-  document.getElementById("c_widget")?.classList.remove("hidden");
+// Post body as { html, tocHTML, plainPreview }. Prefers the fragment pre-rendered by
+// scripts/render_posts.py (no markdown fetch, no marked, no image manifest); the
+// markdown is parsed here only when that fragment is missing.
+function loadPostBody(post) {
+  return fetch(`posts/html/${post.filename.replace(/\.md$/, "")}.html`)
+    .then((res) => (res.ok ? res.text() : Promise.reject(res.status)))
+    .then((html) => ({
+      html,
+      tocHTML: buildTOC(post.outline || []),
+      plainPreview: post.excerpt || "",
+    }))
+    .catch(() => renderMarkdownBody(post));
+}
 
-  Promise.all([fetch(`posts/${post.filename}`), imageManifestReady])
-    .then(([res]) => res.text())
+function renderMarkdownBody(post) {
+  return Promise.all([fetch(`posts/${post.filename}`), TbdData.manifestFor(post.filename), loadMarked()])
+    .then(([res, manifest]) => {
+      imageManifest = manifest || {};
+      return res.text();
+    })
     .then((md) => {
       let content = md;
       if (md.startsWith("---")) {
@@ -495,9 +535,20 @@ function renderFullPost(post, skipPushState = false) {
           const srcPath = `${postDir}/attachments/${filename.trim()}`;
           const orig = `posts/${srcPath}`;
           const entry = imageManifest[srcPath];
+          if (entry && entry.mp4 && entry.mp4.length) {
+            // Animated GIF with an MP4 copy: a muted looping video is far lighter than the GIF
+            const mp4 = entry.mp4[entry.mp4.length - 1];
+            return `<video autoplay loop muted playsinline preload="metadata" width='${entry.w}' height='${entry.h}' aria-label='${filename.trim()}' style='max-width:100%;height:auto;'><source src='${mp4.path}' type='video/mp4'><img src='${orig}' alt='${filename.trim()}' loading="lazy"></video>`;
+          }
           if (entry && entry.variants && entry.variants.length) {
             const srcset = entry.variants.map((v) => `${v.path} ${v.w}w`).join(", ");
-            return `<img src='${orig}' srcset='${srcset}' sizes='(max-width: 900px) 100vw, 800px' width='${entry.w}' height='${entry.h}' alt='${filename.trim()}' loading="lazy" style='max-width:100%;height:auto;'>`;
+            // Paint the manifest placeholder (blurry thumb over dominant colour) until the variant loads;
+            // transparent images have no colour and paint the thumb alone
+            const background = [entry.color, entry.lqip && `url(${entry.lqip}) center/cover no-repeat`]
+              .filter(Boolean)
+              .join(" ");
+            const placeholder = background ? `background:${background};` : "";
+            return `<img src='${orig}' srcset='${srcset}' sizes='(max-width: 900px) 100vw, 800px' width='${entry.w}' height='${entry.h}' alt='${filename.trim()}' loading="lazy" decoding="async" style='max-width:100%;height:auto;${placeholder}'>`;
           }
           return `<img src='${orig}' alt='${filename.trim()}' loading="lazy" style='max-width:100%;'>`;
         }
@@ -511,6 +562,27 @@ function renderFullPost(post, skipPushState = false) {
         .split("\n")
         .map(l => l.replace(/^#{1,6}\s+/, "").replace(/[*_`~[\]()!]/g, "").trim())
         .find(l => l.length > 0) || "";
+
+      return { html: parseMarkdownWithIDs(content), tocHTML: generateTOC(content), plainPreview };
+    });
+}
+
+function renderFullPost(post, skipPushState = false) {
+  savedScrollPos = postsContainer.scrollTop;
+  if (!skipPushState) {
+    history.pushState(
+      { post: post.filename },
+      "",
+      `?post=${encodeURIComponent(post.filename)}`
+    );
+  }
+  document.title = post.title
+    ? `${post.title} | Blog | tbd`
+    : `${document.title}`;
+  document.getElementById("c_widget")?.classList.remove("hidden");
+
+  loadPostBody(post)
+    .then(({ html, tocHTML, plainPreview }) => {
       setPostOGMeta(post, plainPreview);
 
       const postDiv = document.createElement("div");
@@ -556,8 +628,6 @@ function renderFullPost(post, skipPushState = false) {
         : `<span>→</span>`; // placeholder
       navHTML += `</div>`;
 
-      const tocHTML = generateTOC(content);
-
       const postUrl = location.origin + location.pathname + "?post=" + encodeURIComponent(post.filename);
       postDiv.innerHTML = `
         <div class="post-topbar">
@@ -569,7 +639,7 @@ function renderFullPost(post, skipPushState = false) {
         <div class="post-meta">${date} | ${categoriesStr}<span class="view-count"></span></div>
         <div class="reactions-container"></div>
         ${tocHTML}
-        <div class="post-content" dir="auto">${parseMarkdownWithIDs(content)}</div>
+        <div class="post-content" dir="auto">${html}</div>
       ${navHTML}`;
       postsContainer.innerHTML = "";
 
@@ -677,6 +747,101 @@ function getPostCategories(post) {
     : [];
 }
 
+// ── Full-text search over post bodies ──
+// Mirrors terms()/stem() in scripts/generate_search_index.py exactly; change
+// both together (and bump SEARCH_INDEX_VERSION there and here).
+const SEARCH_INDEX_VERSION = 1;
+const NIQQUD_RE = /[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4\u05C5\u05C7]/g;
+const TERM_RE = /[a-z0-9]+|[\u05D0-\u05EA]+/g;
+const HEBREW_PREFIXES = "והבלמשכ";
+
+// { query, files: Set of post filenames whose body matches } for the last search
+let bodyMatches = null;
+
+function stemTerm(token) {
+  if (token[0] >= "א" && token[0] <= "ת") {
+    let i = 0;
+    while (i < 2 && token.length - i > 3 && HEBREW_PREFIXES.includes(token[i])) i++;
+    return token.slice(i);
+  }
+  if (/^\d+$/.test(token)) return token;
+  if (token.endsWith("ies") && token.length > 4) token = token.slice(0, -3) + "y";
+  else if (token.endsWith("s") && !/(ss|us|is)$/.test(token) && token.length > 3)
+    token = token.slice(0, -1);
+  if (token.endsWith("ing") && token.length > 5) token = token.slice(0, -3);
+  else if (token.endsWith("ed") && token.length > 4) token = token.slice(0, -2);
+  if (token.endsWith("e") && token.length > 3) token = token.slice(0, -1);
+  return token;
+}
+
+function searchTokens(text) {
+  const tokens = text.toLowerCase().replace(NIQQUD_RE, "").match(TERM_RE) || [];
+  return tokens.filter((t) => t.length >= 2);
+}
+
+// Index forms a still-incomplete last word may be the start of: its stem,
+// the raw token, and the raw token minus each leading Hebrew prefix letter.
+// stemTerm() only strips a prefix once 3+ letters follow it, so "שלו" stays
+// "שלו" while the finished "שלום" is indexed as "לום"; "לו" keeps it matching.
+function partialForms(token) {
+  const forms = new Set([stemTerm(token), token]);
+  for (let i = 0; i < 2 && token.length - i > 2 && HEBREW_PREFIXES.includes(token[i]); i++)
+    forms.add(token.slice(i + 1));
+  return [...forms];
+}
+
+// Resolve to the Set of filenames whose body contains every query term (the
+// last one as a prefix, since it may still be being typed), or null when the
+// index is unavailable. Only the shards for the query's first letters load.
+function searchBodies(query) {
+  const tokens = searchTokens(query);
+  const D = window.TbdData;
+  if (!tokens.length || !D) return Promise.resolve(null);
+  return D.searchMeta().then((meta) => {
+    if (!meta || meta.version !== SEARCH_INDEX_VERSION) return null;
+    const shardFor = (word) => {
+      const key = word.codePointAt(0).toString(16);
+      return meta.shards[key] ? D.searchShard(key) : Promise.resolve({});
+    };
+    return Promise.all(
+      tokens.map((token, i) => {
+        if (i < tokens.length - 1) {
+          const word = stemTerm(token);
+          return shardFor(word).then((shard) => new Set((shard[word] || []).map((p) => p[0])));
+        }
+        const forms = partialForms(token);
+        return Promise.all(forms.map(shardFor)).then((shards) => {
+          const ids = new Set();
+          forms.forEach((word, f) => {
+            for (const term in shards[f]) {
+              if (term.startsWith(word) || (term.length >= 3 && word.startsWith(term)))
+                shards[f][term].forEach((p) => ids.add(p[0]));
+            }
+          });
+          return ids;
+        });
+      })
+    ).then((sets) => {
+      const ids = sets.reduce((a, b) => new Set([...a].filter((id) => b.has(id))));
+      return new Set([...ids].map((id) => meta.docs[id]).filter(Boolean));
+    });
+  });
+}
+
+// Re-render once body matches for the current query arrive, if they add posts
+function updateBodyMatches() {
+  const query = currentSearch.trim();
+  if (!query) {
+    bodyMatches = null;
+    return;
+  }
+  searchBodies(query).then((files) => {
+    if (!files || currentSearch.trim() !== query) return;
+    bodyMatches = { query, files };
+    if (files.size) renderPosts(window.currentCategory || "all", true);
+  });
+}
+
 window.renderPosts = renderPosts;
 window.currentCategory = "all";
 categoryList.addEventListener("click", (e) => {
@@ -756,21 +921,23 @@ function generateCategoryList() {
 }
 
 function generateTOC(markdown) {
-  const lines = markdown.split("\n");
-
-  const headings = lines
-    .map(line => {
-      const match = /^(#{1,6})\s+(.*)/.exec(line.trim());
-      if (!match) return null;
-      const level = match[1].length;
-      const text = match[2].trim();
-      const slug = text
-        .toLowerCase()
-        .replace(/[^a-z0-9\s-]/g, "")
-        .replace(/\s+/g, "-");
-      return { level, text, slug };
-    })
-    .filter(Boolean);
+  const outline = markdown
+    .split("\n")
+    .map((line) => /^(#{1,6})\s+(.*)/.exec(line.trim()))
+    .filter(Boolean)
+    .map((match) => [match[1].length, match[2].trim()]);
+  return buildTOC(outline);
+}
+
+// TOC from [[level, text], ...] (the index's "outline", or generateTOC above)
+function buildTOC(outline) {
+  const headings = outline.map(([level, text]) => {
+    const slug = text
+      .toLowerCase()
+      .replace(/[^a-z0-9\s-]/g, "")
+      .replace(/\s+/g, "-");
+    return { level, text, slug };
+  });
 
   let html = '<ul class="toc">';
   let prevLevel = 1;
@@ -817,12 +984,14 @@ fetch("posts/index.json")
         currentSearch = e.target.value;
         if (searchClear) searchClear.hidden = !currentSearch;
         renderPosts(window.currentCategory || "all", true);
+        updateBodyMatches();
       });
     }
     if (searchClear) {
       searchClear.addEventListener("click", () => {
         searchInput.value = "";
         currentSearch = "";
+        bodyMatches = null;
         searchClear.hidden = true;
         searchInput.focus();
         renderPosts(window.currentCategory || "all", true);
@@ -65,7 +65,21 @@
             }
             const cover = document.createElement("div");
             cover.className = "vinyl-cover";
-            if (r.cover) {
+            const thumb = r.thumb && r.thumb.variants && r.thumb.variants.length ? r.thumb : null;
+            if (thumb) {
+              // Mirrored by fetch_discogs_collection.py: same-origin WebP, known size
+              const img = document.createElement("img");
+              img.src = thumb.variants[0].path;
+              img.srcset = thumb.variants.map((v) => `${v.path} ${v.w}w`).join(", ");
+              img.sizes = "180px";
+              img.width = thumb.w;
+              img.height = thumb.h;
+              img.alt = `${r.artist} — ${r.title}`;
+              img.loading = "lazy";
+              img.decoding = "async";
+              if (thumb.color) cover.style.background = thumb.color;
+              cover.appendChild(img);
+            } else if (r.cover) {
               const img = document.createElement("img");
               img.src = r.cover;
               img.alt = `${r.artist} — ${r.title}`;
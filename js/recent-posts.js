@@ -5,10 +5,9 @@
 
   var LIMIT = 5;
 
-  fetch("posts/index.json")
-    .then(function (r) { return r.ok ? r.json() : []; })
+  window.TbdData.postsHead()
     .then(function (posts) {
-      // Already sorted newest-first from generate_posts_index, but sort defensively
+      // Already sorted newest-first by generate_posts_index, but sort defensively
       posts = posts.slice().sort(function (a, b) {
         return (Date.parse(b.date) || 0) - (Date.parse(a.date) || 0);
       });
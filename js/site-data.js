@@ -22,6 +22,22 @@
     posts: function () {
       return cached("posts", "posts/index.json", []);
     },
+    // Newest posts only (posts/index/head.json, a few KB) — for widgets that
+    // show the latest handful; falls back to the full index
+    postsHead: function () {
+      return cached("postsHead", "posts/index/head.json", null).then(function (head) {
+        return Array.isArray(head) ? head : window.TbdData.posts();
+      });
+    },
+    // Full-text search index (posts/search/, built by generate_search_index.py):
+    // meta.json lists doc ids and shard keys; each shard holds the postings
+    // for terms starting with one character
+    searchMeta: function () {
+      return cached("searchMeta", "posts/search/meta.json", null);
+    },
+    searchShard: function (key) {
+      return cached("search:" + key, "posts/search/" + key + ".json", {});
+    },
     songlog: function () {
       return cached("songlog", "data/songlog.json", [], function (d) {
         return d && Array.isArray(d.tracks) ? d.tracks : [];
@@ -45,6 +61,16 @@
     manifest: function () {
       return cached("manifest", "assets/img/manifest.json", {});
     },
+    // Image manifest slice for one post's directory (assets/img/manifest/),
+    // falling back to the full manifest when the shard lookup is unavailable
+    manifestFor: function (postFilename) {
+      var dir = (postFilename || "").split("/").slice(0, -1).join("/");
+      return cached("manifestIndex", "assets/img/manifest/index.json", null).then(function (index) {
+        if (!index) return window.TbdData.manifest();
+        if (!index[dir]) return {};
+        return cached("manifest:" + dir, "assets/img/manifest/" + index[dir] + ".json", {});
+      });
+    },
 
     // ── helpers (the single definition of each) ──
     postDateStr: function (p) {
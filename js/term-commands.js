@@ -13,7 +13,7 @@
   // Thin callback adapters over the shared data layer
   function withPosts(fn) { D.posts().then(fn); }
   function withSonglog(fn) { D.songlog().then(fn); }
-  function withManifest(fn) { D.manifest().then(fn); }
+  function withManifest(postFilename, fn) { D.manifestFor(postFilename).then(fn); }
   function withProjects(fn) { D.projects().then(fn); }
   function withDiscogs(fn) { D.discogs().then(fn); }
   function withTrips(fn) { D.trips().then(fn); }
@@ -110,7 +110,7 @@
                 if (/\.(png|jpe?g|webp)$/i.test(f)) embeds.push(f);
               }
               if (!embeds.length) return tryNext();
-              withManifest(function (manifest) {
+              withManifest(p.filename, function (manifest) {
                 var dir = p.filename.split("/").slice(0, -1).join("/");
                 var el = line("", "term-day-photos");
                 embeds.forEach(function (f) {
@@ -2,13 +2,23 @@
  * Travel page: map of travel posts. Each marker links to a post.
  * Uses Leaflet + MarkerCluster + ant-path + Carto dark tiles.
  *
- * Coordinate resolution priority (per post):
+ * Post coordinates come precomputed from posts/resolved_locations.json
+ * (scripts/resolve_travel_locations.py). Posts it doesn't list are resolved
+ * here by resolveCoords, in priority order:
  *   1. posts/locations.json  — explicit manual override keyed by filename
- *   2. posts/timeline.json   — Google Maps Timeline visits matched by post date
+ *   2. posts/timeline/       — Google Maps Timeline visits matched by post date
+ *                              (month shards of those dates; posts/timeline.json
+ *                              if there is no shard index)
  *   3. posts/geocoded.json   — Nominatim build-time cache (Polarsteps era fallback)
  *
  * Route antpath is drawn through all timeline points (visits + tracks) in
  * chronological order, colored by the country of the nearest travel post.
+ * Each trip's segments come precomputed as encoded polylines from
+ * posts/travel_routes.json (scripts/build_travel_routes.py); trips it doesn't
+ * cover are routed here from the posts and timeline points.
+ *
+ * Timeline dots load per trip shard, on demand: the newest trip's first, the
+ * rest when their chip is selected or the map zooms in on them.
  */
 (function () {
   var mapEl = document.getElementById("travel-map");
@@ -72,11 +82,17 @@
     return 2 * R * Math.asin(Math.sqrt(s));
   }
 
+  // has_coords(): {skip: true} geocode entries and other stubs have no position
+  function hasCoords(entry) {
+    return !!entry && typeof entry.lat === "number" && typeof entry.lng === "number";
+  }
+
+  // Keep in sync with resolve_post() in scripts/resolve_travel_locations.py
   function resolveCoords(post, manualOverrides, timelineByDate, geocoded, countryGeoCoords) {
     var filename = post.filename || "";
     // 1. Manual override
     var manual = manualOverrides[filename];
-    if (manual && typeof manual.lat === "number" && typeof manual.lng === "number") {
+    if (hasCoords(manual)) {
       return [manual.lat, manual.lng];
     }
     // 2. Timeline visits matched by post date
@@ -85,7 +101,7 @@
     if (visits && visits.length) {
       var geo = geocoded[filename];
       var best;
-      if (geo) {
+      if (hasCoords(geo)) {
         // Find visit closest to geocoded coords
         var closest = visits[0];
         var closestDist = dist2(geo.lat, geo.lng, closest.lat, closest.lng);
@@ -123,7 +139,7 @@
     }
     // 3. Nominatim-geocoded coords (build-time cache)
     var geo = geocoded[filename];
-    if (geo && typeof geo.lat === "number" && typeof geo.lng === "number") {
+    if (hasCoords(geo)) {
       return [geo.lat, geo.lng];
     }
     return null;
@@ -169,21 +185,167 @@
     return pts;
   }
 
+  // Google encoded polyline (1e-5 precision) -> [[lat, lng], ...]
+  function decodePolyline(str) {
+    var pts = [];
+    var index = 0, lat = 0, lng = 0;
+    while (index < str.length) {
+      var vals = [];
+      for (var k = 0; k < 2; k++) {
+        var shift = 0, result = 0, b;
+        do {
+          b = str.charCodeAt(index++) - 63;
+          result |= (b & 0x1f) << shift;
+          shift += 5;
+        } while (b >= 0x20);
+        vals.push(result & 1 ? ~(result >> 1) : result >> 1);
+      }
+      lat += vals[0];
+      lng += vals[1];
+      pts.push([lat / 1e5, lng / 1e5]);
+    }
+    return pts;
+  }
+
+  function fetchJson(url, fallback) {
+    return fetch(url).then(function (r) { return r.ok ? r.json() : fallback; }).catch(function () { return fallback; });
+  }
+
+  function concatParts(parts) {
+    return [].concat.apply([], parts.filter(Array.isArray));
+  }
+
+  function pointDate(pt) {
+    return pt.date || (pt.timestamp && pt.timestamp.split("T")[0]) || "";
+  }
+
+  // date -> [{lat, lng}] of timeline visits (all visits per day)
+  function visitsByDate(points) {
+    var byDate = {};
+    points.forEach(function (pt) {
+      if (pt.type !== "visit") return;
+      var d = pointDate(pt);
+      if (d && typeof pt.lat === "number" && typeof pt.lng === "number") {
+        if (!byDate[d]) byDate[d] = [];
+        byDate[d].push({ lat: pt.lat, lng: pt.lng });
+      }
+    });
+    return byDate;
+  }
+
+  // Timeline points from posts/timeline/ (scripts/takeout_to_timeline.py):
+  // one trip's shard, or the month shards covering a set of dates. Without
+  // the shard index, the monolithic timeline.json (fetched once) stands in.
+  function timelineSource(index) {
+    var sharded = index && Array.isArray(index.trips);
+    var whole = null;
+    function all() {
+      if (!whole) whole = fetchJson("posts/timeline.json", []);
+      return whole;
+    }
+    return {
+      sharded: sharded,
+      shardFor: function (tripId) {
+        if (!sharded) return null;
+        for (var i = 0; i < index.trips.length; i++) {
+          if (index.trips[i].id === tripId) return index.trips[i];
+        }
+        return null;
+      },
+      forTrip: function (tripId) {
+        if (!sharded) return all();
+        var shard = this.shardFor(tripId);
+        return shard ? fetchJson("posts/timeline/" + shard.file, []) : Promise.resolve([]);
+      },
+      forDates: function (dates) {
+        if (!sharded) return all();
+        var months = {};
+        dates.forEach(function (d) { if (d) months[d.slice(0, 7)] = true; });
+        var files = (index.months || []).filter(function (m) { return months[m.month]; });
+        return Promise.all(files.map(function (m) {
+          return fetchJson("posts/timeline/" + m.file, []);
+        })).then(concatParts);
+      }
+    };
+  }
+
+  // Coordinates for each travel post: the build-time resolution where it has
+  // an entry (null = known unmappable); the raw sources (and the timeline
+  // months of those posts' dates) are fetched and joined in the browser only
+  // for posts it doesn't list yet.
+  function resolveAll(travel, timeline) {
+    return fetchJson("posts/resolved_locations.json", {}).then(function (resolved) {
+      resolved = resolved || {};
+      var missing = travel.filter(function (p) { return !(p.filename in resolved); });
+      var sources = missing.length
+        ? Promise.all([
+            fetchJson("posts/locations.json", {}),
+            fetchJson("posts/geocoded.json", {}),
+            timeline.forDates(missing.map(postDate))
+          ])
+        : Promise.resolve([{}, {}, []]);
+      return sources.then(function (raw) {
+        var manualOverrides = raw[0] || {};
+        var geocoded        = raw[1] || {};
+        var timelineByDate  = visitsByDate(Array.isArray(raw[2]) ? raw[2] : []);
+
+        // Build country -> [geocoded coords] from geocoded.json only.
+        // Used in resolveCoords to distinguish "visits are in right country but geocoded is a
+        // bad centroid" (use last visit) from "all visits are abroad on a flight day" (use geocoded).
+        var countryGeoCoords = {};
+        travel.forEach(function (post) {
+          var g = geocoded[post.filename || ""];
+          if (!hasCoords(g)) return;
+          var c = getCountry(post);
+          if (c) {
+            if (!countryGeoCoords[c]) countryGeoCoords[c] = [];
+            countryGeoCoords[c].push([g.lat, g.lng]);
+          }
+        });
+
+        var withCoords = [];
+        travel.forEach(function (post) {
+          var coords;
+          if (post.filename in resolved) {
+            var r = resolved[post.filename];
+            coords = r ? [r.lat, r.lng] : null;
+          } else {
+            coords = resolveCoords(post, manualOverrides, timelineByDate, geocoded, countryGeoCoords);
+          }
+          if (coords) withCoords.push({ post: post, coords: coords });
+        });
+        return withCoords;
+      });
+    });
+  }
+
   Promise.all([
     D.posts(),
-    fetch("posts/locations.json").then(function (r) { return r.ok ? r.json() : {}; }).catch(function () { return {}; }),
-    fetch("posts/timeline.json").then(function (r) { return r.ok ? r.json() : []; }).catch(function () { return []; }),
-    fetch("posts/geocoded.json").then(function (r) { return r.ok ? r.json() : {}; }).catch(function () { return {}; }),
+    fetchJson("posts/timeline/index.json", null),
     D.trips(),
-    D.songlog()
+    D.songlog(),
+    fetchJson("posts/travel_routes.json", null)
   ])
+  .then(function (results) {
+    var timeline = timelineSource(results[1]);
+
+    // Filter to travel posts and resolve coordinates
+    var travel = results[0].filter(function (p) {
+      var cats = p.categories || (p.category ? [p.category] : []);
+      return cats.some(function (c) { return (c || "").toLowerCase() === "travel"; });
+    });
+
+    return resolveAll(travel, timeline).then(function (withCoords) {
+      return results.concat([timeline, withCoords]);
+    });
+  })
   .then(function (results) {
     var posts           = results[0];
-    var manualOverrides = results[1] || {};
-    var timelinePoints  = Array.isArray(results[2]) ? results[2] : [];
-    var geocoded        = results[3] || {};
-    var tripsConfig     = results[4];
-    var songlogTracks   = results[5];
+    var tripsConfig     = results[2];
+    var songlogTracks   = results[3];
+    var routes          = results[4] && Array.isArray(results[4].trips) ? results[4].trips : [];
+    var timeline        = results[5];
+    var withCoords      = results[6];
 
     // The map and the song log describe the same days — join them.
     var dateToSong = {};
@@ -211,43 +373,6 @@
         "</div>";
     }
 
-    // Build date -> [{lat, lng}] from timeline visits (all visits per day)
-    var timelineByDate = {};
-    timelinePoints.forEach(function (pt) {
-      if (pt.type !== "visit") return;
-      var d = pt.date || (pt.timestamp && pt.timestamp.split("T")[0]);
-      if (d && typeof pt.lat === "number" && typeof pt.lng === "number") {
-        if (!timelineByDate[d]) timelineByDate[d] = [];
-        timelineByDate[d].push({ lat: pt.lat, lng: pt.lng });
-      }
-    });
-
-    // Filter to travel posts and resolve coordinates
-    var travel = posts.filter(function (p) {
-      var cats = p.categories || (p.category ? [p.category] : []);
-      return cats.some(function (c) { return (c || "").toLowerCase() === "travel"; });
-    });
-
-    // Build country -> [geocoded coords] from geocoded.json only.
-    // Used in resolveCoords to distinguish "visits are in right country but geocoded is a
-    // bad centroid" (use last visit) from "all visits are abroad on a flight day" (use geocoded).
-    var countryGeoCoords = {};
-    travel.forEach(function (post) {
-      var g = geocoded[post.filename || ""];
-      if (!g || typeof g.lat !== "number") return;
-      var c = getCountry(post);
-      if (c) {
-        if (!countryGeoCoords[c]) countryGeoCoords[c] = [];
-        countryGeoCoords[c].push([g.lat, g.lng]);
-      }
-    });
-
-    var withCoords = [];
-    travel.forEach(function (post) {
-      var coords = resolveCoords(post, manualOverrides, timelineByDate, geocoded, countryGeoCoords);
-      if (coords) withCoords.push({ post: post, coords: coords });
-    });
-
     if (withCoords.length === 0) {
       mapEl.innerHTML = "<p class='travel-map-fallback'>No travel posts with known locations yet.</p>";
       return;
@@ -331,8 +456,27 @@
     // country changes but don't add a coordinate (their resolved coordinate IS
     // one of the timeline visits; adding it would create a zigzag).
     // Route segments keep COUNTRY coloring; trip colors mark chips + replay.
+    var routesById = {};
+    routes.forEach(function (r) { routesById[r.id] = r; });
+
     trips.forEach(function (trip) {
       trip.routeLayer = L.layerGroup();
+
+      var prebuilt = routesById[trip.id];
+      if (!prebuilt) return; // routed once its timeline points load
+      prebuilt.segments.forEach(function (seg) {
+        var latlngs = decodePolyline(seg.line);
+        if (seg.crossing) {
+          addSegment(trip.routeLayer, arcPoints(latlngs[0], latlngs[latlngs.length - 1]), getCountryColor(seg.country));
+        } else {
+          addSegment(trip.routeLayer, latlngs, getCountryColor(seg.country), true);
+        }
+      });
+    });
+
+    // Keep in sync with trip_segments() in scripts/build_travel_routes.py
+    // timelinePoints are the trip's own; timelineByDate covers its date range.
+    function routeTrip(trip, timelinePoints, timelineByDate) {
       var allRoutePts = [];
 
       trip.items.forEach(function (item) {
@@ -348,9 +492,7 @@
       });
 
       timelinePoints.forEach(function (pt) {
-        if (typeof pt.lat !== "number" || typeof pt.lng !== "number") return;
-        var d = pt.date || (pt.timestamp && pt.timestamp.split("T")[0]) || "";
-        if (tripForDate(d) !== trip) return;
+        var d = pointDate(pt);
         allRoutePts.push({
           coords: [pt.lat, pt.lng],
           country: countryForDate(d),
@@ -393,22 +535,33 @@
           addSegment(trip.routeLayer, curCoords, getCountryColor(curCountry), true);
         }
       }
-    });
+    }
 
-    // --- Timeline point markers (clickable, link to post of that day) ---
-    timelinePoints.forEach(function (pt) {
-      if (typeof pt.lat !== "number" || typeof pt.lng !== "number") return;
-      var d = pt.date || (pt.timestamp && pt.timestamp.split("T")[0]);
-      var owner = tripForDate(d);
-      if (!owner) return;
-      var post = d && dateToPost[d];
-      var ptCountry = countryForDate(d);
-      var marker = L.marker([pt.lat, pt.lng], { icon: makeDotIcon(getCountryColor(ptCountry)), zIndexOffset: -100 });
-      if (post) {
-        marker.bindPopup(postPopup(post));
-      }
-      owner.routeLayer.addLayer(marker);
-    });
+    // --- Timeline points, one trip at a time ---
+    // A shard holds every point in its trip's date range; only points whose
+    // date the trip owns (tripForDate) are drawn, so days where two trips'
+    // ranges overlap appear once. Markers link to the post of that day.
+    function loadTripTimeline(trip) {
+      if (trip.timelineLoad) return trip.timelineLoad;
+      trip.timelineLoad = timeline.forTrip(trip.id).then(function (points) {
+        points = Array.isArray(points) ? points : [];
+        var own = points.filter(function (pt) {
+          return typeof pt.lat === "number" && typeof pt.lng === "number" &&
+            tripForDate(pointDate(pt)) === trip;
+        });
+        if (!routesById[trip.id]) routeTrip(trip, own, visitsByDate(points));
+        own.forEach(function (pt) {
+          var d = pointDate(pt);
+          var post = dateToPost[d];
+          var marker = L.marker([pt.lat, pt.lng], { icon: makeDotIcon(getCountryColor(countryForDate(d))), zIndexOffset: -100 });
+          if (post) {
+            marker.bindPopup(postPopup(post));
+          }
+          trip.routeLayer.addLayer(marker);
+        });
+      });
+      return trip.timelineLoad;
+    }
 
     // --- Post markers (clustered, on top) ---
     var postIcon = L.divIcon({
@@ -479,6 +632,7 @@
           if (map.hasLayer(trip.markerLayer)) map.removeLayer(trip.markerLayer);
         }
       });
+      if (selectedId !== "all") selectedTrips().forEach(loadTripTimeline);
       var pts = [];
       selectedTrips().forEach(function (t) { pts = pts.concat(t.latLngs); });
       if (pts.length > 0) {
@@ -546,6 +700,30 @@
 
     applySelection();
 
+    // Newest trip's timeline first; the others once the map is zoomed in far
+    // enough for their dots to matter and their shard is in view. Without a
+    // shard index every trip reads the one timeline.json anyway.
+    var TIMELINE_MIN_ZOOM = 6;
+    if (!timeline.sharded) {
+      trips.forEach(loadTripTimeline);
+    } else {
+      // Trips missing from travel_routes.json are routed from their points
+      trips.forEach(function (trip) {
+        if (trip === trips[trips.length - 1] || !routesById[trip.id]) loadTripTimeline(trip);
+      });
+      trips.forEach(function (trip) {
+        var shard = timeline.shardFor(trip.id);
+        trip.shardBounds = shard && shard.bounds ? L.latLngBounds(shard.bounds) : null;
+      });
+      map.on("moveend", function () {
+        if (map.getZoom() < TIMELINE_MIN_ZOOM) return;
+        var view = map.getBounds();
+        selectedTrips().forEach(function (trip) {
+          if (trip.shardBounds && view.intersects(trip.shardBounds)) loadTripTimeline(trip);
+        });
+      });
+    }
+
     // --- Replay v2: camera stays fixed; a tracer draws the route ---
     var replayBtn = document.getElementById("journey-replay");
     var hudEl = document.getElementById("journey-replay-hud");
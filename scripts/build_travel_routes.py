@@ -0,0 +1,219 @@
+"""
+Precompute the travel map's route lines as encoded polylines.
+
+Writes posts/travel_routes.json:
+  { "trips": [ { "id", "root", "bounds", "segments": [
+      { "country", "line", "bounds"[, "crossing": true] }, ... ] } ] }
+
+Segments are what the per-trip route loop in js/travel.js would draw, in
+draw order: dashed runs of post and timeline positions, split wherever
+consecutive posts change country, and "crossing" segments (just the two
+endpoints; the browser bends them into a border arc). "line" is a Google
+encoded polyline at 1e-5 degree precision and "bounds" is [[south, west],
+[north, east]].
+
+Inputs are the same ones the map joins: travel posts from posts/index.json
+placed by posts/resolved_locations.json, trips from data/trips.json and
+points from posts/timeline.json. Run after resolve_travel_locations.py:
+  python scripts/build_travel_routes.py
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+
+from resolve_travel_locations import (
+    INDEX_FILE, OUT_FILE as RESOLVED_FILE, TIMELINE_FILE,
+    get_country, is_number, is_travel, load_json, post_date, resolve_locations, visits_by_date,
+)
+
+# Windows consoles default to cp1252; post filenames are Hebrew/UTF-8
+if sys.stdout.encoding and sys.stdout.encoding.lower() not in ("utf-8", "utf8"):
+    sys.stdout.reconfigure(encoding="utf-8")
+
+REPO_ROOT  = Path(__file__).resolve().parent.parent
+TRIPS_FILE = REPO_ROOT / "data" / "trips.json"
+OUT_FILE   = REPO_ROOT / "posts" / "travel_routes.json"
+
+PRECISION = 1e5
+
+
+def encode_polyline(coords):
+    """Google encoded polyline of [(lat, lng), ...]. A point that rounds to
+    the same 1e-5 cell as the previous one is dropped: it would encode as a
+    zero delta and draw nothing."""
+    out = []
+    prev_lat = prev_lng = 0
+    for lat, lng in coords:
+        ilat, ilng = round(lat * PRECISION), round(lng * PRECISION)
+        if out and (ilat, ilng) == (prev_lat, prev_lng):
+            continue
+        for delta in (ilat - prev_lat, ilng - prev_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lng = ilat, ilng
+    return "".join(out)
+
+
+def bounds(coords):
+    lats = [c[0] for c in coords]
+    lngs = [c[1] for c in coords]
+    return [[min(lats), min(lngs)], [max(lats), max(lngs)]]
+
+
+def group_trips(with_coords, config):
+    """Trips as travel.js builds them: posts grouped by first folder, in
+    order of their first post."""
+    by_root = {t["root"]: t for t in config if t.get("root")}
+    trips = {}
+    for post, coords in with_coords:
+        root = (post.get("filename") or "").split("/")[0]
+        if root not in trips:
+            cfg = by_root.get(root, {})
+            trips[root] = {
+                "id": cfg.get("id") or re.sub(r"\s+", "-", root.lower()),
+                "root": root,
+                "items": [],
+            }
+        trips[root]["items"].append((post, coords))
+    for trip in trips.values():
+        trip["first"] = post_date(trip["items"][0][0])
+        trip["last"] = post_date(trip["items"][-1][0])
+    return sorted(trips.values(), key=lambda t: t["first"])
+
+
+def country_lookup(with_coords):
+    """countryForDate(): country of the latest post on or before a date."""
+    by_date = {}
+    for post, _ in with_coords:
+        d = post_date(post)
+        if d:
+            by_date[d] = get_country(post)
+    dates = sorted(by_date)
+
+    def country_for(d):
+        country = ""
+        for day in dates:
+            if day > d:
+                break
+            country = by_date[day]
+        return country
+    return country_for
+
+
+def trip_segments(trip, timeline, trip_for, country_for, timeline_by_date):
+    """Mirror of the per-trip route loop in js/travel.js."""
+    points = []
+    for post, coords in trip["items"]:
+        d = post_date(post)
+        points.append({
+            "coords": coords,
+            "country": get_country(post),
+            "ts": d + "T00:00:00",   # sort before same-day timeline points
+            "is_post": True,
+            "add": not (d and d in timeline_by_date),
+        })
+    for pt in timeline:
+        if not (is_number(pt.get("lat")) and is_number(pt.get("lng"))):
+            continue
+        d = pt.get("date") or (pt.get("timestamp") or "").split("T")[0]
+        if trip_for(d) is not trip:
+            continue
+        points.append({
+            "coords": (pt["lat"], pt["lng"]),
+            "country": country_for(d),
+            "ts": pt.get("timestamp") or d,
+            "is_post": False,
+            "add": True,
+        })
+    points.sort(key=lambda p: p["ts"])
+
+    segments = []
+    if len(points) < 2:
+        return segments
+
+    def flush(coords, country, crossing=False):
+        segment = {"country": country, "line": encode_polyline(coords), "bounds": bounds(coords)}
+        if crossing:
+            segment["crossing"] = True
+        segments.append(segment)
+
+    country = points[0]["country"]
+    current = [points[0]["coords"]] if points[0]["add"] else []
+    for rp in points[1:]:
+        if rp["is_post"] and rp["country"] != country:
+            if len(current) >= 2:
+                flush(current, country)
+            if current:
+                flush([current[-1], rp["coords"]], rp["country"], crossing=True)
+            country = rp["country"]
+            current = [rp["coords"]]
+        elif rp["add"]:
+            current.append(rp["coords"])
+    if len(current) >= 2:
+        flush(current, country)
+    return segments
+
+
+def build_routes(posts, resolved, timeline, config):
+    travel = [p for p in posts if is_travel(p)]
+    with_coords = []
+    for post in travel:
+        r = resolved.get(post.get("filename") or "")
+        if r:
+            with_coords.append((post, (r["lat"], r["lng"])))
+    with_coords.sort(key=lambda item: item[0].get("date") or "")
+
+    trips = group_trips(with_coords, config)
+    country_for = country_lookup(with_coords)
+    timeline_by_date = visits_by_date(timeline)
+
+    def trip_for(d):
+        if not d:
+            return None
+        for trip in trips:
+            if trip["first"] <= d <= trip["last"]:
+                return trip
+        return None
+
+    out = []
+    for trip in trips:
+        segments = trip_segments(trip, timeline, trip_for, country_for, timeline_by_date)
+        entry = {"id": trip["id"], "root": trip["root"], "segments": segments}
+        if segments:
+            entry["bounds"] = [
+                [min(s["bounds"][0][0] for s in segments), min(s["bounds"][0][1] for s in segments)],
+                [max(s["bounds"][1][0] for s in segments), max(s["bounds"][1][1] for s in segments)],
+            ]
+        out.append(entry)
+    return {"trips": out}
+
+
+def main():
+    if not INDEX_FILE.exists():
+        print(f"[!] Index file not found: {INDEX_FILE}")
+        sys.exit(1)
+
+    posts = load_json(INDEX_FILE, [])
+    resolved = load_json(RESOLVED_FILE, None)
+    if not isinstance(resolved, dict):
+        resolved = resolve_locations(posts)
+    timeline = load_json(TIMELINE_FILE, []) or []
+    config = load_json(TRIPS_FILE, []) or []
+
+    routes = build_routes(posts, resolved, timeline, config)
+    content = json.dumps(routes, ensure_ascii=False, separators=(",", ":")) + "\n"
+    if not OUT_FILE.exists() or OUT_FILE.read_text(encoding="utf-8") != content:
+        OUT_FILE.write_text(content, encoding="utf-8")
+
+    n_segments = sum(len(t["segments"]) for t in routes["trips"])
+    print(f"[+] {len(routes['trips'])} trip route(s), {n_segments} segment(s) -> "
+          f"{OUT_FILE.relative_to(REPO_ROOT)} ({len(content.encode('utf-8')) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,51 +11,17 @@ check_health.py — scan all blog posts and report potential issues:
 
 import json
 import os
-import re
 import sys
 from pathlib import Path
 
-import yaml
+from post_corpus import load_posts
+from resolve_travel_locations import OUT_FILE as RESOLVED_FILE, resolve_locations
 
 # Windows consoles default to cp1252; post filenames are Hebrew/UTF-8
 if sys.stdout.encoding and sys.stdout.encoding.lower() not in ("utf-8", "utf8"):
     sys.stdout.reconfigure(encoding="utf-8")
 
 POSTS_DIR = Path("posts")
-LOCATIONS_FILE = POSTS_DIR / "locations.json"
-
-
-def parse_frontmatter(filepath: Path):
-    """Return (fm_dict, body) or (None, raw_text) on parse failure."""
-    try:
-        text = filepath.read_text(encoding="utf-8")
-    except Exception as e:
-        return None, str(e)
-
-    if not text.startswith("---"):
-        return {}, text
-
-    end = text.find("---", 3)
-    if end == -1:
-        return None, text
-
-    try:
-        fm = yaml.safe_load(text[3:end]) or {}
-    except yaml.YAMLError as e:
-        return None, text[3:end]
-
-    body = text[end + 3:].strip()
-    return fm, body
-
-
-def get_image_refs(body: str) -> list:
-    """Extract (kind, ref) image refs; kind is 'obsidian' or 'markdown'."""
-    refs = []
-    # Obsidian embeds: ![[filename.jpg]] or ![[filename.jpg|300]]
-    refs += [("obsidian", m) for m in re.findall(r"!\[\[(.+?)\]\]", body)]
-    # Standard markdown images: ![alt](path)
-    refs += [("markdown", m) for m in re.findall(r"!\[.*?\]\((.+?)\)", body)]
-    return refs
 
 
 def main():
@@ -63,39 +29,21 @@ def main():
         print(f"[!] Posts directory '{POSTS_DIR}' not found. Run from repo root.")
         sys.exit(1)
 
-    # Load coordinate sources for travel-post checks — a travel post is mappable
-    # if ANY source covers it (same resolution order as js/travel.js)
-    locations = {}
-    if LOCATIONS_FILE.exists():
-        try:
-            locations = json.loads(LOCATIONS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            pass
-
-    geocoded = {}
-    geocoded_file = POSTS_DIR / "geocoded.json"
-    if geocoded_file.exists():
-        try:
-            raw = json.loads(geocoded_file.read_text(encoding="utf-8"))
-            geocoded = {
-                k: v for k, v in raw.items()
-                if isinstance(v, dict) and isinstance(v.get("lat"), (int, float))
-            }
-        except Exception:
-            pass
-
-    timeline_dates = set()
-    timeline_file = POSTS_DIR / "timeline.json"
-    if timeline_file.exists():
+    # Travel posts are mappable when the build-time resolver (same rules as
+    # js/travel.js) found coordinates; resolve in memory if it hasn't run yet.
+    # It covers the travel posts in posts/index.json, so posts it leaves out
+    # (not in the index yet, or not travel there) aren't judged by it.
+    resolved = None
+    if RESOLVED_FILE.exists():
         try:
-            for pt in json.loads(timeline_file.read_text(encoding="utf-8")):
-                if pt.get("date"):
-                    timeline_dates.add(pt["date"])
+            resolved = json.loads(RESOLVED_FILE.read_text(encoding="utf-8"))
         except Exception:
             pass
+    if not isinstance(resolved, dict):
+        resolved = resolve_locations()
 
-    md_files = sorted(POSTS_DIR.rglob("*.md"))
-    if not md_files:
+    posts = load_posts()
+    if not posts:
         print("No markdown files found.")
         return
 
@@ -104,12 +52,13 @@ def main():
     errors_by_file = {}
     warnings_by_file = {}
 
-    for filepath in md_files:
-        rel = filepath.relative_to(POSTS_DIR).as_posix()
+    for post in posts:
+        rel = post["rel"]
+        filepath = post["path"]
         errors = []
         warnings = []
 
-        fm, body = parse_frontmatter(filepath)
+        fm = post["frontmatter"]
 
         if fm is None:
             errors.append("MALFORMED frontmatter (YAML parse error)")
@@ -141,21 +90,15 @@ def main():
         if not categories or categories == [""]:
             warnings.append("Missing categories")
 
-        # Travel posts should be resolvable to map coordinates by some source
+        # Travel posts should be resolvable to map coordinates: the resolver
+        # tried and came back empty (null), not merely left the post out
         cat_lower = [c.lower() for c in (categories or [])]
-        if "travel" in cat_lower:
-            date_part = str(fm.get("date", "")).strip().split(" ")[0].split("T")[0]
-            covered = (
-                rel in locations
-                or rel in geocoded
-                or (date_part and date_part in timeline_dates)
-            )
-            if not covered:
-                warnings.append("Travel post not mappable (no locations/geocoded/timeline coverage)")
+        if "travel" in cat_lower and rel in resolved and resolved[rel] is None:
+            warnings.append("Travel post not mappable (no manual/timeline/geocoded coordinates)")
 
         # Referenced images should exist (blog.js renders ![[X]] from the
         # post's attachments/ subfolder; markdown paths are site-root relative)
-        for kind, img_ref in get_image_refs(body):
+        for kind, img_ref in post["image_refs"]:
             img_path_str = img_ref.split("?")[0].split("#")[0].split("|")[0].strip()
             if img_path_str.startswith(("http://", "https://")):
                 continue
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+check_render_parity.py — fail when render_posts.py and marked disagree.
+
+The post view shows the pre-rendered posts/html/ fragment when there is one
+and falls back to marked (js/vendor/marked.min.js) when there isn't, so both
+must produce the same page. This renders every published post (embeds
+resolved as in render_posts.py) with markdown-it and with the vendored
+marked under node, then compares the two as parsed HTML: the same elements,
+attributes and text, ignoring whitespace between tags, entity spelling,
+heading ids and the .table-scroll wrapper (both added after parsing, by
+render_posts.py and parseMarkdownWithIDs() respectively). The listing
+cards' "preview_html" in posts/index.json is held to marked's rendering of
+their "preview" the same way.
+
+Requires node on PATH and markdown-it-py with linkify.
+
+Run from repo root:
+  python scripts/check_render_parity.py     # exit 1 on any mismatch
+"""
+import json
+import re
+import subprocess
+import sys
+from html.parser import HTMLParser
+
+from post_corpus import POSTS_DIR, REPO_ROOT, is_published, load_posts
+from render_posts import MANIFEST_FILE, embed_entries, embed_source, make_renderer
+
+# Windows consoles default to cp1252; post filenames are Hebrew/UTF-8
+if sys.stdout.encoding and sys.stdout.encoding.lower() not in ("utf-8", "utf8"):
+    sys.stdout.reconfigure(encoding="utf-8")
+
+MARKED = REPO_ROOT / "js" / "vendor" / "marked.min.js"
+INDEX_FILE = POSTS_DIR / "index.json"
+# Reads a JSON list of markdown strings on stdin, writes marked's HTML for each
+NODE_SCRIPT = """
+const { marked } = require(process.argv[1]);
+const chunks = [];
+process.stdin.on("data", (c) => chunks.push(c));
+process.stdin.on("end", () => {
+  const docs = JSON.parse(Buffer.concat(chunks).toString("utf8"));
+  process.stdout.write(JSON.stringify(docs.map((d) => marked.parse(d))));
+});
+"""
+MAX_REPORTED = 10
+
+
+class Canonical(HTMLParser):
+    """Flatten HTML to a list of tags and whitespace-collapsed text runs."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items = []
+
+    def handle_starttag(self, tag, attrs):
+        self.items.append(f"<{tag} {sorted((k, v) for k, v in attrs if k != 'id')}>")
+
+    def handle_endtag(self, tag):
+        self.items.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        text = re.sub(r"\s+", " ", data).strip()
+        if text:
+            self.items.append(text)
+
+
+def canonical(fragment: str) -> list:
+    fragment = re.sub(r'<div class="table-scroll">(<table>.*?</table>)</div>', r"\1", fragment, flags=re.S)
+    parser = Canonical()
+    parser.feed(fragment)
+    parser.close()
+    return parser.items
+
+
+def first_difference(a: list, b: list) -> str:
+    i = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+    ours = a[i] if i < len(a) else "(end)"
+    theirs = b[i] if i < len(b) else "(end)"
+    return f"{ours!r} vs marked {theirs!r}"
+
+
+def main():
+    manifest = {}
+    if MANIFEST_FILE.exists():
+        manifest = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+    md = make_renderer()
+
+    posts = [post for post in load_posts() if is_published(post)]
+    cases = [(post["rel"], embed_source(post, embed_entries(post, manifest))) for post in posts]
+    ours = [md.render(source) for _, source in cases]
+    if INDEX_FILE.exists():
+        cards = [e for e in json.loads(INDEX_FILE.read_text(encoding="utf-8")) if "preview_html" in e]
+        cases += [(f"{e['filename']} (card)", e["preview"]) for e in cards]
+        ours += [e["preview_html"] for e in cards]
+    sources = [source for _, source in cases]
+    try:
+        result = subprocess.run(["node", "-e", NODE_SCRIPT, str(MARKED)], input=json.dumps(sources),
+                                capture_output=True, text=True, encoding="utf-8", check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        sys.exit(f"[!] Could not run marked under node: {getattr(e, 'stderr', None) or e}")
+    theirs = json.loads(result.stdout)
+
+    mismatched = []
+    for (name, _), a, b in zip(cases, ours, theirs):
+        ca, cb = canonical(a), canonical(b)
+        if ca != cb:
+            mismatched.append((name, first_difference(ca, cb)))
+
+    for rel, diff in mismatched[:MAX_REPORTED]:
+        print(f"  {rel}: {diff}")
+    if len(mismatched) > MAX_REPORTED:
+        print(f"  ... and {len(mismatched) - MAX_REPORTED} more")
+    print(f"[{'!' if mismatched else '+'}] Render parity: {len(cases) - len(mismatched)} of {len(cases)} "
+          f"posts and cards match marked")
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
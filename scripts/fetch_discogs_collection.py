@@ -4,76 +4,283 @@ Auth: the collection is private on Discogs, so either
   - set DISCOGS_TOKEN (personal access token from discogs.com/settings/developers), or
   - make the collection public in Discogs privacy settings (no token needed).
 
+Releases are requested newest-first (sort=added, sort_order=desc). By default
+the sync is incremental: it walks pages until it meets a copy already in
+data/discogs.json (matched by Discogs' per-copy instance_id) and prepends what
+is new — one request on a quiet week. If the merged count disagrees with the
+collection's total (a record was removed) or the stored data predates
+instance_id, it falls back to a full sync: page one reports the page count and
+the rest are fetched concurrently over one pooled session. --full forces that,
+and also picks up edits to releases already stored.
+
+Requests honour the X-Discogs-Ratelimit-* headers: once the remaining budget
+for the minute runs low, workers pace themselves, and a 429 waits and retries.
+
+Covers are mirrored into assets/covers/ so the shelf never hotlinks Discogs:
+each sleeve is downloaded once, named by the SHA-1 of its bytes, and encoded
+to small WebP thumbnails with generate_image_variants.py's encoder. Each entry
+keeps the remote "cover" URL (the shelf's fallback, and the key that lets
+later runs skip the download) and gains "thumb": {hash, w, h, color,
+variants: [{w, path}]}. A failed download just leaves that entry without a
+thumb; thumbnails no entry references are pruned.
+
 Fails loudly on API errors and refuses to overwrite existing data with an
 empty result, so a misconfigured run can never blank the shelf.
+
+Usage:
+  python scripts/fetch_discogs_collection.py          # incremental
+  python scripts/fetch_discogs_collection.py --full   # re-fetch every page
 """
+import argparse
+import hashlib
+import io
 import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+from generate_image_variants import QUALITY, encode_webp, normalize_mode, placeholder
 
 USERNAME = os.environ.get("DISCOGS_USERNAME", "tbdtbd")
 TOKEN = os.environ.get("DISCOGS_TOKEN", "")
 OUTPUT_PATH = "data/discogs.json"
 
 BASE_URL = f"https://api.discogs.com/users/{USERNAME}/collection/folders/0/releases"
+PER_PAGE = 100
+WORKERS = 4
+RATE_WINDOW_S = 60      # Discogs limits are per moving minute
+RATE_RESERVE = WORKERS  # start pacing when this few requests remain
+MAX_RETRIES = 5
+COVERS_DIR = "assets/covers"
+# Shelf cards are ~140-180 CSS px wide; 320 covers 2x screens
+COVER_WIDTHS = [160, 320]
+
+
+class DiscogsError(Exception):
+    pass
+
+
+class RateLimiter:
+    """Shared view of the X-Discogs-Ratelimit-* headers across workers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limit = None
+        self.remaining = None
 
+    def wait(self):
+        with self.lock:
+            low = self.remaining is not None and self.remaining <= RATE_RESERVE
+            delay = RATE_WINDOW_S / (self.limit or 25)
+        if low:
+            time.sleep(delay)
 
-def fetch_collection():
-    headers = {"User-Agent": "tbd.codes vinyl shelf/1.0"}
+    def update(self, resp):
+        with self.lock:
+            try:
+                self.limit = int(resp.headers["X-Discogs-Ratelimit"])
+                self.remaining = int(resp.headers["X-Discogs-Ratelimit-Remaining"])
+            except (KeyError, ValueError):
+                pass
+
+
+def make_session():
+    session = requests.Session()
+    session.headers["User-Agent"] = "tbd.codes vinyl shelf/1.0"
     if TOKEN:
-        headers["Authorization"] = f"Discogs token={TOKEN}"
+        session.headers["Authorization"] = f"Discogs token={TOKEN}"
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WORKERS)
+    session.mount("https://", adapter)
+    return session
 
-    page = 1
-    per_page = 100
-    all_releases = []
 
-    while True:
-        print(f"Fetching page {page}...")
-        resp = requests.get(BASE_URL, headers=headers, params={"page": page, "per_page": per_page})
+def fetch_page(session, limiter, page):
+    params = {"page": page, "per_page": PER_PAGE, "sort": "added", "sort_order": "desc"}
+    for attempt in range(MAX_RETRIES):
+        limiter.wait()
+        resp = session.get(BASE_URL, params=params, timeout=30)
+        limiter.update(resp)
+        if resp.status_code == 429:
+            delay = float(resp.headers.get("Retry-After") or RATE_WINDOW_S / 4 * 2 ** attempt)
+            print(f"  page {page}: rate limited, retrying in {delay:.0f}s")
+            time.sleep(delay)
+            continue
         if resp.status_code != 200:
-            msg = resp.json().get("message", resp.text[:200])
-            sys.exit(f"Discogs API error {resp.status_code}: {msg}\n"
-                     "Hint: set DISCOGS_TOKEN or make the collection public.")
-        data = resp.json()
-
-        releases = data.get("releases", [])
-        if not releases:
-            break
-
-        for r in releases:
-            info = r.get("basic_information", {})
-            all_releases.append({
-                "id": info.get("id"),
-                "date_added": (r.get("date_added") or "")[:10],
-                "title": info.get("title"),
-                "artist": ", ".join(a["name"] for a in info.get("artists", [])),
-                "year": info.get("year"),
-                "genres": info.get("genres", []),
-                "styles": info.get("styles", []),
-                "formats": [f["name"] for f in info.get("formats", [])],
-                "cover": info.get("cover_image"),
-            })
+            try:
+                msg = resp.json().get("message", resp.text[:200])
+            except ValueError:
+                msg = resp.text[:200]
+            raise DiscogsError(f"Discogs API error {resp.status_code}: {msg}")
+        return resp.json()
+    raise DiscogsError(f"Discogs API still rate limiting page {page} after {MAX_RETRIES} attempts")
+
 
+def to_entry(r):
+    info = r.get("basic_information", {})
+    return {
+        "id": info.get("id"),
+        "instance_id": r.get("instance_id"),
+        "date_added": (r.get("date_added") or "")[:10],
+        "title": info.get("title"),
+        "artist": ", ".join(a["name"] for a in info.get("artists", [])),
+        "year": info.get("year"),
+        "genres": info.get("genres", []),
+        "styles": info.get("styles", []),
+        "formats": [f["name"] for f in info.get("formats", [])],
+        "cover": info.get("cover_image"),
+    }
+
+
+def fetch_all(session, limiter, first):
+    """Every release, given page one: pages 2..N in parallel, in page order."""
+    pages = first.get("pagination", {}).get("pages", 1)
+    print(f"Fetching {pages} page(s) ({first.get('pagination', {}).get('items', '?')} releases)...")
+    results = [first]
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            results += pool.map(lambda p: fetch_page(session, limiter, p), range(2, pages + 1))
+    return [to_entry(r) for data in results for r in data.get("releases", [])]
+
+
+def fetch_new(session, limiter, first, known):
+    """Releases newer than the first already-stored copy, or None if the walk
+    ran off the end without meeting one."""
+    data, page = first, 1
+    new = []
+    while True:
+        for r in data.get("releases", []):
+            if r.get("instance_id") in known:
+                return new
+            new.append(to_entry(r))
         if data.get("pagination", {}).get("pages", 0) <= page:
-            break
+            return None
         page += 1
+        print(f"Fetching page {page}...")
+        data = fetch_page(session, limiter, page)
+
+
+def encode_cover(data, digest):
+    """Write WebP thumbnails of one downloaded cover; return its "thumb"."""
+    with Image.open(io.BytesIO(data)) as im:
+        im = normalize_mode(im)
+        w, h = im.size
+        variants = []
+        for target in [t for t in COVER_WIDTHS if t < w] or [w]:
+            resized = im if target == w else im.resize((target, max(1, round(h * target / w))), Image.LANCZOS)
+            path = f"{COVERS_DIR}/{digest[:12]}.{target}.webp"
+            with open(path, "wb") as f:
+                f.write(encode_webp(resized, QUALITY))
+            variants.append({"w": target, "path": path})
+        color = placeholder(resized)["color"]
+    return {"hash": digest, "w": w, "h": h, "color": color, "variants": variants}
+
+
+def thumb_exists(thumb):
+    return bool(thumb) and all(os.path.exists(v["path"]) for v in thumb.get("variants", []))
 
-    if not all_releases and os.path.exists(OUTPUT_PATH):
+
+def mirror_covers(session, releases, existing):
+    """Attach a local "thumb" to every release with a cover, downloading only
+    covers whose URL no stored entry has already mirrored."""
+    previous = {r["cover"]: r["thumb"] for r in existing
+                if r.get("cover") and thumb_exists(r.get("thumb"))}
+    by_hash = {t["hash"]: t for t in previous.values()}
+    todo = sorted({r["cover"] for r in releases if r.get("cover")} - set(previous))
+
+    def mirror(url):
         try:
-            existing = json.load(open(OUTPUT_PATH, encoding="utf-8"))
-        except Exception:
-            existing = []
-        if existing:
-            sys.exit("Refusing to overwrite non-empty data/discogs.json with an empty collection.")
+            resp = session.get(url, timeout=30)
+            resp.raise_for_status()
+            digest = hashlib.sha1(resp.content).hexdigest()
+            return by_hash.get(digest) or encode_cover(resp.content, digest)
+        except Exception as e:  # noqa: BLE001 — one bad sleeve must not kill the sync
+            print(f"  WARN cover {url[:80]}: {e}")
+            return None
+
+    os.makedirs(COVERS_DIR, exist_ok=True)
+    thumbs = dict(previous)
+    if todo:
+        print(f"Mirroring {len(todo)} cover(s)...")
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            thumbs.update(zip(todo, pool.map(mirror, todo)))
+
+    for r in releases:
+        thumb = thumbs.get(r.get("cover"))
+        if thumb:
+            r["thumb"] = thumb
+        else:
+            r.pop("thumb", None)
+
+    keep = {os.path.basename(v["path"]) for r in releases for v in r.get("thumb", {}).get("variants", [])}
+    pruned = 0
+    for name in os.listdir(COVERS_DIR):
+        if name.endswith(".webp") and name not in keep:
+            os.remove(os.path.join(COVERS_DIR, name))
+            pruned += 1
+    mirrored = sum(1 for r in releases if "thumb" in r)
+    remote = sum(1 for r in releases if r.get("cover") and "thumb" not in r)
+    print(f"Covers: {len(todo)} fetched, {mirrored} mirrored, {remote} remote only, {pruned} pruned")
+
+
+def load_existing():
+    if not os.path.exists(OUTPUT_PATH):
+        return []
+    try:
+        with open(OUTPUT_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return []
+
+
+def fetch_collection(full=False):
+    existing = load_existing()
+    session = make_session()
+    limiter = RateLimiter()
+
+    try:
+        print("Fetching page 1...")
+        first = fetch_page(session, limiter, 1)
+        total = first.get("pagination", {}).get("items")
+
+        known = {r.get("instance_id") for r in existing}
+        releases = None
+        if not full and existing and None not in known:
+            new = fetch_new(session, limiter, first, known)
+            if new is not None and len(new) + len(existing) == total:
+                print(f"Incremental sync: {len(new)} new release(s)")
+                releases = new + [dict(r) for r in existing]
+            else:
+                print("Stored collection is out of step with Discogs; doing a full sync")
+        if releases is None:
+            releases = fetch_all(session, limiter, first)
+    except (DiscogsError, requests.RequestException) as e:
+        sys.exit(f"{e}\nHint: set DISCOGS_TOKEN or make the collection public.")
+
+    if not releases and existing:
+        sys.exit("Refusing to overwrite non-empty data/discogs.json with an empty collection.")
+
+    mirror_covers(session, releases, existing)
+
+    if releases == existing:
+        print(f"No changes ({len(releases)} releases)")
+        return
 
     os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
     with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(all_releases, f, ensure_ascii=False, indent=2)
+        json.dump(releases, f, ensure_ascii=False, indent=2)
 
-    print(f"Saved {len(all_releases)} releases to {OUTPUT_PATH}")
+    print(f"Saved {len(releases)} releases to {OUTPUT_PATH}")
 
 
 if __name__ == "__main__":
-    fetch_collection()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true",
+                        help="re-fetch every page instead of stopping at stored releases")
+    args = parser.parse_args()
+    fetch_collection(full=args.full)
@@ -6,23 +6,98 @@ filenames contain Hebrew and spaces; srcset cannot tolerate spaces), and
 maintains assets/img/manifest.json mapping source paths to variants.
 
 Originals are never modified. Idempotent: unchanged files (by SHA-1) are
-skipped; variants whose source disappeared are pruned.
+skipped; variants whose source disappeared are pruned. The SHA-1 is the
+authority, but .cache/image_stat.json remembers each source's size+mtime and
+git blob id so a no-op run is a directory walk: only files whose signature
+moved are re-read and hashed. Fresh CI checkouts reset every mtime, so there
+the blob id does the work — for files the working tree has unchanged from
+the git index (the sync rsyncs with --checksum, leaving them untouched),
+`git ls-files -s` names their content without reading it. (The stat cache
+lives outside manifest.json so touched but unchanged files don't churn the
+published manifest.)
+
+Decoding and encoding run in a process pool (--jobs, default: CPU count)
+since WebP encodes dominate wall time after a trip drops hundreds of photos
+into the vault. Each source is an independent task, so one bad image still
+only fails itself; results are merged into a sorted manifest, so output is
+identical to a serial run (--jobs 1).
+
+Large JPEGs are decoded at a reduced DCT scale when every target is far
+below the source, and smaller widths are resized from the next larger
+variant rather than the full image. --verify re-runs the plain full-size
+pipeline alongside and reports PSNR per variant to prove the output is
+visually equivalent.
+
+--min-ssim SSIM replaces the fixed QUALITY with a per-image search for the
+lowest quality whose decoded widest variant keeps luminance SSIM >= SSIM, so
+flat screenshots shrink and busy landscapes get the bits they need. The
+chosen quality is stored as "q" and the threshold as "min_ssim" in the
+manifest entry; the quality is reused while the source hash and threshold are
+unchanged. An entry encoded under another mode (fixed quality, a different
+threshold) is re-encoded, so switching modes needs no --force.
+
+Alongside the monolithic manifest.json (kept for compatibility), entries
+are split per post directory into assets/img/manifest/<key>.json with a
+small assets/img/manifest/index.json mapping each directory to its key, so
+a post page fetches only its own slice.
+
+Animated GIFs get animated WebP variants at the same widths, with "frames"
+and "duration" (ms) in their entry; --mp4 adds looping H.264 copies under
+"mp4" when ffmpeg is on PATH. A frame that can't be decoded truncates the
+animation there; a GIF whose first frame fails is left to pass through.
+
+Each entry also carries a placeholder for instant paint: "lqip", a ~12 px
+WebP data URI, and "color", the dominant colour (None for images with
+transparency, which paint the LQIP alone). They're computed with the
+variants, and backfilled from the smallest variant for entries that
+predate them.
 """
+import argparse
+import base64
 import hashlib
+import io
 import json
+import math
+import os
+import shutil
+import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from PIL import Image, ImageOps
+from PIL import ExifTags, Image, ImageChops, ImageOps, ImageStat
 
 ROOT = Path(__file__).resolve().parent.parent
 POSTS = ROOT / "posts"
 OUT = ROOT / "assets" / "img"
 MANIFEST = OUT / "manifest.json"
+# Per-post-directory slices of the manifest plus a {dir: shard} lookup, so a
+# post page only downloads the entries for its own attachments
+SHARDS = OUT / "manifest"
+SHARD_INDEX = SHARDS / "index.json"
+STAT_CACHE = ROOT / ".cache" / "image_stat.json"
 WIDTHS = [800, 1600]
 QUALITY = 82
-# GIF/SVG pass through untouched (animation / vector); webp already efficient
+# Decode JPEGs at >= this multiple of the largest target, and derive a smaller
+# width from the next larger variant only when that is >= this multiple of it
+DRAFT_MARGIN = 1.25
+PYRAMID_MARGIN = 2
+# --verify fails any variant below this PSNR against the direct full-size resize
+VERIFY_MIN_PSNR = 38.0
+ORIENTATION_TAG = ExifTags.Base.Orientation
+# --min-ssim searches this quality range per source instead of using QUALITY
+QUALITY_RANGE = (40, 95)
+SSIM_WINDOW = 7
+# Inline placeholder painted by js/blog.js until the real variant streams in
+PLACEHOLDER_WIDTH = 12
+PLACEHOLDER_QUALITY = 30
+# SVG passes through untouched (vector); webp already efficient
 EXTS = {".png", ".jpg", ".jpeg"}
+# Animated GIFs become animated WebP (+ MP4 with --mp4 when ffmpeg exists);
+# single-frame GIFs go through the still pipeline
+GIF_EXTS = {".gif"}
+GIF_DEFAULT_DURATION = 100  # ms; GIFs without a frame delay play at 10 fps
+MP4_CRF = 28
 
 
 def file_hash(path):
@@ -33,67 +108,501 @@ def file_hash(path):
     return h.hexdigest()
 
 
+def load_stat_cache():
+    if not STAT_CACHE.exists():
+        return {}
+    try:
+        return json.loads(STAT_CACHE.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def save_stat_cache(stats):
+    STAT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STAT_CACHE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(stats, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+    tmp.replace(STAT_CACHE)
+
+
+def git_blob_ids():
+    """{posts-relative path: git blob id} for files under posts/ whose working
+    copy still matches the git index. Empty outside a git work tree."""
+    try:
+        staged = subprocess.run(["git", "ls-files", "-s", "-z", "--", "posts"],
+                                cwd=ROOT, capture_output=True, check=True).stdout
+        dirty = subprocess.run(["git", "diff-files", "--name-only", "-z", "--", "posts"],
+                               cwd=ROOT, capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    dirty = set(dirty.decode("utf-8").split("\0"))
+    blobs = {}
+    for record in staged.decode("utf-8").split("\0"):
+        if not record:
+            continue
+        meta, path = record.split("\t", 1)
+        if path not in dirty:
+            blobs[path[len("posts/"):]] = meta.split()[1]
+    return blobs
+
+
+def source_hash(src, rel, old_stats, new_stats, blobs):
+    """SHA-1 of src, trusting the cached hash while its git blob id or its
+    size+mtime are unchanged.
+
+    Returns (digest, rehashed).
+    """
+    st = src.stat()
+    sig = old_stats.get(rel)
+    blob = blobs.get(rel)
+    rehashed = not (sig and (
+        (blob and sig.get("blob") == blob)
+        or (sig["size"] == st.st_size and sig["mtime_ns"] == st.st_mtime_ns)
+    ))
+    digest = file_hash(src) if rehashed else sig["hash"]
+    new_stats[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+    if blob:
+        new_stats[rel]["blob"] = blob
+    return digest, rehashed
+
+
+def open_oriented(src):
+    """Open src upright and return (image, full_w, full_h).
+
+    When every target is far below the source, JPEGs are decoded at a reduced
+    DCT scale (Image.draft) that still leaves DRAFT_MARGIN x the largest
+    target, so a 4000 px phone photo never has to be fully decoded.
+    full_w/full_h are the oriented source dimensions either way.
+    """
+    im = Image.open(src)
+    w, h = im.size
+    if im.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8):
+        w, h = h, w
+    targets = [t for t in WIDTHS if t < w]
+    if im.format == "JPEG" and targets:
+        scale = DRAFT_MARGIN * max(targets) / w
+        if scale <= 0.5:
+            im.draft("RGB", (math.ceil(im.width * scale), math.ceil(im.height * scale)))
+    oriented = ImageOps.exif_transpose(im)
+    if oriented is not im:
+        im.close()
+    return oriented, w, h
+
+
+def normalize_mode(im):
+    if im.mode in ("P", "RGBA", "LA"):
+        return im.convert("RGBA")
+    return im.convert("RGB")
+
+
+def resize_pyramid(im, w, h):
+    """Yield (target, resized) widest first; each width is derived from the
+    next larger variant once that is at least PYRAMID_MARGIN x the target."""
+    larger = None
+    for target in sorted((t for t in WIDTHS if t < w), reverse=True):
+        base = larger if larger and larger.width >= PYRAMID_MARGIN * target else im
+        larger = base.resize((target, max(1, round(h * target / w))), Image.LANCZOS)
+        yield target, larger
+
+
+def psnr(a, b):
+    """Peak signal-to-noise ratio in dB between two same-size images."""
+    diff = ImageChops.difference(a, b)
+    mse = sum(v * v for v in ImageStat.Stat(diff).rms) / len(diff.getbands())
+    return float("inf") if mse == 0 else 10 * math.log10(255 * 255 / mse)
+
+
+def reference_variants(src, w, h):
+    """The straightforward pipeline: full decode, direct LANCZOS per width."""
+    with Image.open(src) as im:
+        im = normalize_mode(ImageOps.exif_transpose(im))
+        return {
+            target: im.resize((target, max(1, round(h * target / w))), Image.LANCZOS)
+            for target in WIDTHS if target < w
+        }
+
+
+def encode_webp(im, quality):
+    buf = io.BytesIO()
+    im.save(buf, "WEBP", quality=quality, method=4)
+    return buf.getvalue()
+
+
+def ssim(a, b):
+    """Mean structural similarity of two same-size images, on luminance.
+
+    Uses SSIM_WINDOW x SSIM_WINDOW uniform windows computed from summed-area
+    tables. Needs numpy (only the --min-ssim mode does).
+    """
+    import numpy as np
+
+    def window_mean(img):
+        k = SSIM_WINDOW
+        sat = np.pad(img, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+        return (sat[k:, k:] - sat[:-k, k:] - sat[k:, :-k] + sat[:-k, :-k]) / (k * k)
+
+    x = np.asarray(a.convert("L"), dtype=np.float64)
+    y = np.asarray(b.convert("L"), dtype=np.float64)
+    if min(x.shape) < SSIM_WINDOW:
+        return 1.0 if np.array_equal(x, y) else 0.0
+    mx, my = window_mean(x), window_mean(y)
+    vx = window_mean(x * x) - mx * mx
+    vy = window_mean(y * y) - my * my
+    cxy = window_mean(x * y) - mx * my
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    s = ((2 * mx * my + c1) * (2 * cxy + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+    return float(s.mean())
+
+
+def search_quality(im, min_ssim):
+    """Binary-search the lowest WebP quality whose decode keeps SSIM >= min_ssim.
+
+    Returns (quality, encoded_bytes); QUALITY_RANGE's top if nothing passes.
+    """
+    lo, hi = QUALITY_RANGE
+    best = None
+    while lo <= hi:
+        q = (lo + hi) // 2
+        data = encode_webp(im, q)
+        with Image.open(io.BytesIO(data)) as decoded:
+            ok = ssim(im, decoded) >= min_ssim
+        if ok:
+            best, hi = (q, data), q - 1
+        else:
+            lo = q + 1
+    if best is None:
+        top = QUALITY_RANGE[1]
+        best = (top, encode_webp(im, top))
+    return best
+
+
+def placeholder(im):
+    """Return {"lqip", "color"} for an image: a ~12 px WebP data URI and the
+    dominant colour as #rrggbb. An alpha channel that is fully opaque is
+    dropped first. Images with real transparency keep it in the LQIP and get
+    "color": None — a solid backdrop would show through their transparent
+    areas, while the thumb is transparent in the same places."""
+    if im.mode == "RGBA" and im.getchannel("A").getextrema()[0] == 255:
+        im = im.convert("RGB")
+    w, h = im.size
+    thumb = im.resize((PLACEHOLDER_WIDTH, max(1, round(h * PLACEHOLDER_WIDTH / w))),
+                      Image.LANCZOS, reducing_gap=2.0)
+    data = encode_webp(thumb, PLACEHOLDER_QUALITY)
+    color = None
+    if thumb.mode == "RGB":
+        _, rgb = max(thumb.quantize(colors=4).convert("RGB").getcolors())
+        color = "#%02x%02x%02x" % rgb
+    return {
+        "lqip": "data:image/webp;base64," + base64.b64encode(data).decode("ascii"),
+        "color": color,
+    }
+
+
+def variant_placeholder(entry):
+    """Placeholder for an existing manifest entry, from its smallest variant."""
+    smallest = min(entry["variants"], key=lambda v: v["w"])
+    with Image.open(ROOT / smallest["path"]) as im:
+        return placeholder(normalize_mode(im))
+
+
+def read_gif_frames(im):
+    """Return ([frame, ...], [duration_ms, ...]) for an animated GIF.
+
+    Frames come back RGBA when the GIF declares transparency, else RGB.
+    Decoding stops at the first frame that can't be read; it only raises if
+    not even the first frame decodes.
+    """
+    mode = "RGBA" if "transparency" in im.info or im.mode == "RGBA" else "RGB"
+    frames, durations = [], []
+    for index in range(im.n_frames):
+        try:
+            im.seek(index)
+            frame = im.convert(mode)
+        except Exception:  # noqa: BLE001 — keep the frames that did decode
+            if not frames:
+                raise
+            print(f"WARN {Path(im.filename).name}: frame {index} unreadable, "
+                  f"keeping {len(frames)}", file=sys.stderr)
+            break
+        frames.append(frame)
+        durations.append(im.info.get("duration") or GIF_DEFAULT_DURATION)
+    return frames, durations
+
+
+def encode_mp4(src, digest, target, w):
+    """Encode a muted H.264 MP4 at target width via ffmpeg; return its path or None."""
+    name = f"{digest[:12]}.{target}.mp4"
+    # H.264 needs even dimensions
+    scale = f"scale={target - target % 2}:-2" if target < w else "scale=trunc(iw/2)*2:-2"
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", str(src), "-vf", scale,
+         "-an", "-c:v", "libx264", "-crf", str(MP4_CRF), "-pix_fmt", "yuv420p",
+         "-movflags", "+faststart", str(OUT / name)],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        print(f"WARN ffmpeg failed for {Path(src).name}: {result.stderr.strip()[:200]}",
+              file=sys.stderr)
+        return None
+    return f"assets/img/{name}"
+
+
+def encode_animated(src, digest, mp4=False):
+    """Write animated WebP (and optionally MP4) variants for an animated GIF.
+
+    Returns the manifest entry, or None if src isn't animated (single frame).
+    """
+    with Image.open(src) as im:
+        if getattr(im, "n_frames", 1) < 2:
+            return None
+        loop = im.info.get("loop", 0)
+        frames, durations = read_gif_frames(im)
+    w, h = frames[0].size
+    targets = [t for t in WIDTHS if t < w] or [w]
+    variants, videos = [], []
+    for target in targets:
+        size = (target, max(1, round(h * target / w)))
+        scaled = [f if f.size == size else f.resize(size, Image.LANCZOS) for f in frames]
+        name = f"{digest[:12]}.{target}.webp"
+        scaled[0].save(OUT / name, "WEBP", save_all=True, append_images=scaled[1:],
+                       duration=durations, loop=loop, quality=QUALITY, method=4)
+        variants.append({"w": target, "path": f"assets/img/{name}"})
+        if mp4:
+            path = encode_mp4(src, digest, target, w)
+            if path:
+                videos.append({"w": target, "path": path})
+    entry = {"hash": digest, "w": w, "h": h, "variants": variants,
+             "frames": len(frames), "duration": sum(durations)}
+    if videos:
+        entry["mp4"] = videos
+    entry.update(placeholder(scaled[0]))
+    return entry
+
+
+def encode_variants(src, digest, quality=QUALITY, min_ssim=None, verify=False, mp4=False):
+    """Decode one source and write its WebP variants; return its manifest entry.
+
+    quality=None searches the lowest quality meeting min_ssim on the widest
+    variant and uses it for every width; the choice is recorded as "q" so it
+    is only searched once per source hash and threshold (stored as
+    "min_ssim"). With verify, the entry also
+    carries "psnr": {width: dB} against reference_variants() (not written to
+    the manifest). Animated GIFs are handed to encode_animated() (fixed
+    QUALITY; mp4 adds H.264 copies).
+    """
+    if Path(src).suffix.lower() in GIF_EXTS:
+        entry = encode_animated(src, digest, mp4)
+        if entry:
+            return entry
+    im, w, h = open_oriented(src)
+    with im:
+        im = normalize_mode(im)
+        variants = []
+        resized_by_width = {}
+        # Source smaller than every target: single full-size webp copy
+        sized = list(resize_pyramid(im, w, h)) or [(w, im)]
+        for target, resized in sized:
+            if quality is None:
+                quality, data = search_quality(resized, min_ssim)
+            else:
+                data = encode_webp(resized, quality)
+            name = f"{digest[:12]}.{target}.webp"
+            (OUT / name).write_bytes(data)
+            variants.append({"w": target, "path": f"assets/img/{name}"})
+            if resized is not im:
+                resized_by_width[target] = resized
+        variants.sort(key=lambda v: v["w"])
+        entry = {"hash": digest, "w": w, "h": h, "variants": variants}
+        entry.update(placeholder(sized[-1][1]))
+    if min_ssim is not None:
+        entry["q"] = quality
+        entry["min_ssim"] = min_ssim
+    if verify and resized_by_width:
+        reference = reference_variants(src, w, h)
+        entry["psnr"] = {t: psnr(resized_by_width[t], reference[t]) for t in resized_by_width}
+    return entry
+
+
+def same_quality_mode(entry, min_ssim):
+    """Whether entry was encoded under the current quality mode: the same
+    --min-ssim threshold, or fixed QUALITY (no "q") when min_ssim is None.
+    Animated entries always use QUALITY, so any mode accepts them."""
+    if "frames" in entry:
+        return True
+    if min_ssim is None:
+        return "q" not in entry
+    return entry.get("min_ssim") == min_ssim
+
+
+def encode_task(src, digest, **options):
+    """Pool worker: never raises, so one bad image can't take down the batch."""
+    try:
+        return encode_variants(src, digest, **options), None
+    except Exception as e:  # noqa: BLE001 — one bad image must not kill the sync
+        return None, str(e)
+
+
+def run_tasks(tasks, jobs, **options):
+    """Yield (digest, entry, error) for each (digest, src, quality) task."""
+    if jobs <= 1 or len(tasks) <= 1:
+        for digest, src, quality in tasks:
+            yield (digest, *encode_task(src, digest, quality=quality, **options))
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [(digest, pool.submit(encode_task, src, digest, quality=quality, **options))
+                   for digest, src, quality in tasks]
+        for digest, fut in futures:
+            try:
+                yield (digest, *fut.result())
+            except Exception as e:  # noqa: BLE001 — e.g. a worker killed by OOM
+                yield digest, None, f"worker failed: {e}"
+
+
+def post_dir(rel):
+    """Directory of the post(s) owning an attachment ("" for posts/attachments/)."""
+    return rel.rsplit("/attachments/", 1)[0] if "/attachments/" in rel else ""
+
+
+def dump_manifest(data):
+    return json.dumps(data, ensure_ascii=False, indent=0, sort_keys=True) + "\n"
+
+
+def write_if_changed(path, text):
+    if path.exists() and path.read_text(encoding="utf-8") == text:
+        return
+    path.write_text(text, encoding="utf-8")
+
+
+def write_shards(manifest):
+    """Split manifest by post directory into SHARDS/<key>.json and write
+    SHARD_INDEX mapping each directory to its key. Keys are hashes because
+    directory names contain Hebrew and spaces. Stale shards are removed."""
+    by_dir = {}
+    for rel, entry in manifest.items():
+        by_dir.setdefault(post_dir(rel), {})[rel] = entry
+    SHARDS.mkdir(parents=True, exist_ok=True)
+    index = {}
+    for directory, entries in by_dir.items():
+        key = hashlib.sha1(directory.encode("utf-8")).hexdigest()[:12]
+        index[directory] = key
+        write_if_changed(SHARDS / f"{key}.json", dump_manifest(entries))
+    for f in SHARDS.glob("*.json"):
+        if f != SHARD_INDEX and f.stem not in index.values():
+            f.unlink()
+    write_if_changed(SHARD_INDEX, json.dumps(index, ensure_ascii=False, sort_keys=True) + "\n")
+    return len(index)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Generate responsive WebP variants.")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="parallel encoder processes (default: CPU count)")
+    parser.add_argument("--verify", action="store_true",
+                        help="compare each generated variant against a full-size decode and "
+                             f"direct resize; exit 1 if any is below {VERIFY_MIN_PSNR} dB PSNR")
+    parser.add_argument("--force", action="store_true",
+                        help="regenerate every variant, ignoring the manifest")
+    parser.add_argument("--min-ssim", type=float, metavar="SSIM",
+                        help="per-image quality: lowest quality in "
+                             f"{QUALITY_RANGE[0]}-{QUALITY_RANGE[1]} whose SSIM stays >= SSIM "
+                             f"(e.g. 0.98) instead of a fixed {QUALITY}; needs numpy")
+    parser.add_argument("--mp4", action="store_true",
+                        help="also encode animated GIFs to looping MP4 (skipped if ffmpeg "
+                             "is not on PATH)")
+    args = parser.parse_args()
+    if args.mp4 and not shutil.which("ffmpeg"):
+        print("WARN --mp4: ffmpeg not found, encoding animated WebP only", file=sys.stderr)
+        args.mp4 = False
+
     OUT.mkdir(parents=True, exist_ok=True)
     old = {}
     if MANIFEST.exists():
         old = json.loads(MANIFEST.read_text(encoding="utf-8"))
 
+    old_stats = load_stat_cache()
+    blobs = git_blob_ids()
+    stats = {}
     manifest = {}
-    made = skipped = failed = 0
+    pending = {}  # digest -> [rel, ...]; identical files are encoded once
+    sources = {}  # digest -> first src path with that content
+    qualities = {}  # digest -> quality already searched for it
+    skipped = failed = hashed = backfilled = 0
     for src in sorted(POSTS.rglob("*")):
-        if src.suffix.lower() not in EXTS or "attachments" not in src.parts:
+        if src.suffix.lower() not in EXTS | GIF_EXTS or "attachments" not in src.parts:
             continue
         rel = src.relative_to(POSTS).as_posix()
         try:
-            digest = file_hash(src)
-            entry = old.get(rel)
-            if entry and entry.get("hash") == digest and all(
-                (ROOT / v["path"]).exists() for v in entry["variants"]
-            ):
-                manifest[rel] = entry
-                skipped += 1
-                continue
-            with Image.open(src) as im:
-                im = ImageOps.exif_transpose(im)
-                if im.mode in ("P", "RGBA", "LA"):
-                    im = im.convert("RGBA")
-                else:
-                    im = im.convert("RGB")
-                w, h = im.size
-                variants = []
-                for target in WIDTHS:
-                    if target >= w:
-                        continue
-                    ratio = target / w
-                    resized = im.resize((target, max(1, round(h * ratio))), Image.LANCZOS)
-                    name = f"{digest[:12]}.{target}.webp"
-                    resized.save(OUT / name, "WEBP", quality=QUALITY, method=4)
-                    variants.append({"w": target, "path": f"assets/img/{name}"})
-                if not variants:
-                    # Source smaller than every target: single full-size webp copy
-                    name = f"{digest[:12]}.{w}.webp"
-                    im.save(OUT / name, "WEBP", quality=QUALITY, method=4)
-                    variants.append({"w": w, "path": f"assets/img/{name}"})
-                manifest[rel] = {"hash": digest, "w": w, "h": h, "variants": variants}
-                made += 1
-        except Exception as e:  # noqa: BLE001 — one bad image must not kill the sync
+            digest, rehashed = source_hash(src, rel, old_stats, stats, blobs)
+            hashed += rehashed
+        except OSError as e:
             print(f"WARN could not process {rel}: {e}", file=sys.stderr)
             failed += 1
+            continue
+        entry = None if args.force else old.get(rel)
+        reusable = entry and entry.get("hash") == digest and same_quality_mode(entry, args.min_ssim)
+        if reusable and all(
+            (ROOT / v["path"]).exists() for v in entry["variants"] + entry.get("mp4", [])
+        ):
+            if "lqip" not in entry:
+                # Entry predates placeholders: derive one from its smallest variant
+                try:
+                    entry = {**entry, **variant_placeholder(entry)}
+                    backfilled += 1
+                except Exception as e:  # noqa: BLE001 — placeholder is best-effort
+                    print(f"WARN no placeholder for {rel}: {e}", file=sys.stderr)
+            manifest[rel] = entry
+            skipped += 1
+            continue
+        pending.setdefault(digest, []).append(rel)
+        sources.setdefault(digest, src)
+        prev = old.get(rel)
+        if prev and prev.get("hash") == digest and "q" in prev and prev.get("min_ssim") == args.min_ssim:
+            qualities[digest] = prev["q"]
+
+    made = 0
+    scores = []  # (psnr, rel, width)
+    tasks = [
+        (digest, sources[digest], QUALITY if args.min_ssim is None else qualities.get(digest))
+        for digest in pending
+    ]
+    for digest, entry, error in run_tasks(tasks, args.jobs, min_ssim=args.min_ssim,
+                                          verify=args.verify, mp4=args.mp4):
+        if entry and "psnr" in entry:
+            scores += [(db, pending[digest][0], t) for t, db in entry.pop("psnr").items()]
+        for rel in pending[digest]:
+            if error:
+                print(f"WARN could not process {rel}: {error}", file=sys.stderr)
+                failed += 1
+            else:
+                manifest[rel] = entry
+                made += 1
 
     # Prune orphaned variants (source deleted/changed)
-    keep = {Path(v["path"]).name for e in manifest.values() for v in e["variants"]}
+    keep = {
+        Path(v["path"]).name
+        for e in manifest.values() for v in e["variants"] + e.get("mp4", [])
+    }
     pruned = 0
-    for f in OUT.glob("*.webp"):
+    for f in [*OUT.glob("*.webp"), *OUT.glob("*.mp4")]:
         if f.name not in keep:
             f.unlink()
             pruned += 1
 
-    MANIFEST.write_text(
-        json.dumps(manifest, ensure_ascii=False, indent=0, sort_keys=True) + "\n",
-        encoding="utf-8",
-    )
-    print(f"variants: {made} generated, {skipped} unchanged, {pruned} pruned, {failed} failed, {len(manifest)} sources")
+    save_stat_cache(stats)
+    MANIFEST.write_text(dump_manifest(manifest), encoding="utf-8")
+    shards = write_shards(manifest)
+    print(f"variants: {made} generated, {skipped} unchanged, {pruned} pruned, {failed} failed, "
+          f"{len(manifest)} sources in {shards} shards ({hashed} hashed, "
+          f"{backfilled} placeholders backfilled, {args.jobs} jobs)")
+
+    if args.verify:
+        bad = sorted(s for s in scores if s[0] < VERIFY_MIN_PSNR)
+        worst = min(scores)[0] if scores else float("inf")
+        print(f"verify: {len(scores)} variants checked, worst PSNR {worst:.1f} dB, "
+              f"{len(bad)} below {VERIFY_MIN_PSNR} dB")
+        for db, rel, target in bad:
+            print(f"  {db:.1f} dB  {rel} @ {target}w")
+        if bad:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,141 +1,342 @@
-import os
+"""
+Generate posts/index.json from the markdown posts.
+
+Incremental by default: .cache/posts_index_state.json remembers each post's
+content hash and the index entry it produced last time. Only added or
+modified posts are re-extracted, deleted posts are dropped, and index.json is
+left untouched (byte-identical) when nothing changed.
+
+Run from repo root:
+  python scripts/generate_posts_index.py            # incremental
+  python scripts/generate_posts_index.py --full     # ignore stored state
+  python scripts/generate_posts_index.py --verbose  # per-file log lines
+
+Each entry also carries what the blog listing and RSS would otherwise have to
+fetch every markdown file for: the cleaned excerpt (RSS), the listing card's
+preview (as markdown for search and as "preview_html", rendered like
+render_posts.py so the listing never needs marked), word count, reading time,
+heading outline and first image (resolved through assets/img/manifest.json to
+its smallest variant, re-resolved every run so new variants are picked up).
+
+Requires pyyaml and markdown-it-py with linkify.
+
+Alongside index.json (kept for backwards compatibility) it writes compact,
+newest-first slices to posts/index/ so widgets can render from a few KB:
+  head.json            newest HEAD_SIZE posts
+  page-<n>.json        all posts in pages of PAGE_SIZE
+  category-<key>.json  every post in one category
+  manifest.json        total count plus the file, count and date range of each
+
+In GitHub Actions, writes `changed=true|false` plus added/updated/removed
+counts to $GITHUB_OUTPUT so later stages (RSS, sitemap, geocoding) can be
+skipped when no post changed.
+"""
+import argparse
+import hashlib
 import json
+import os
+import re
 import sys
-import yaml
 from pathlib import Path
 from typing import List, Dict, Any
 
+from post_corpus import REPO_ROOT, load_posts
+from render_posts import make_renderer
+
 # Windows consoles default to cp1252; post filenames are Hebrew/UTF-8
 if sys.stdout.encoding and sys.stdout.encoding.lower() not in ("utf-8", "utf8"):
     sys.stdout.reconfigure(encoding="utf-8")
 
 POSTS_DIR = Path("posts")
 INDEX_FILE = POSTS_DIR / "index.json"
-FRONTMATTER_KEYS = ["title", "date", "categories", "uploadto"]
+SHARD_DIR = POSTS_DIR / "index"
+MANIFEST_FILE = Path("assets") / "img" / "manifest.json"
+WORDS_PER_MINUTE = 200
+HEAD_SIZE = 20
+PAGE_SIZE = 50
+STATE_FILE = REPO_ROOT / ".cache" / "posts_index_state.json"
+# Bump whenever index_entry() output changes shape so stale state is discarded
+STATE_VERSION = 4
 
+WORD = re.compile(r"\w+")
+HEADING = re.compile(r"^(#{1,6})\s+(.*)")
+# Obsidian embed or markdown image, whichever comes first in the body
+FIRST_IMAGE = re.compile(r"!\[\[(.+?)\]\]|!\[.*?\]\((.+?)\)")
+# Card previews: marked's output without the post view's ids and wrappers
+MARKDOWN = make_renderer(post_view=False)
 
-def parse_frontmatter(filepath: Path) -> Dict[str, Any]:
-    print(f"[ ] Parsing frontmatter: {filepath}")
-    result = {key: None for key in FRONTMATTER_KEYS}
 
-    try:
-        with filepath.open("r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        if lines and lines[0].strip() == "---":
-            frontmatter = []
-            for line in lines[1:]:
-                if line.strip() == "---":
-                    break
-                frontmatter.append(line)
-
-            fm_data = yaml.safe_load("".join(frontmatter)) or {}
-
-            for key in FRONTMATTER_KEYS:
-                value = fm_data.get(key, None)
-
-                if key == "date":
-                    result[key] = str(value).strip().replace("T", " ") if value else ""
-                elif key == "categories":
-                    if isinstance(value, str):
-                        result[key] = [item.strip() for item in value.split(",")]
-                    elif isinstance(value, list):
-                        result[key] = value
-                    else:
-                        result[key] = []
-                elif key == "uploadto":
-                    if isinstance(value, str):
-                        result[key] = [
-                            item.strip().lower() for item in value.split(",")
-                        ]
-                    elif isinstance(value, list):
-                        result[key] = [str(v).strip().lower() for v in value]
-                    else:
-                        result[key] = []
-                else:
-                    result[key] = str(value).strip() if value else ""
-
-            return result
-        else:
-            print(f"\t[!] No frontmatter found in {filepath}")
-    except Exception as e:
-        print(f"\t[!] Error parsing {filepath}: {e}")
+def word_count(body: str) -> int:
+    """Words of prose: embeds, image/link targets and markdown syntax don't count."""
+    text = re.sub(r"!\[\[.*?\]\]", " ", body)
+    text = re.sub(r"!?\[([^\]]*)\]\([^)]*\)", r"\1", text)
+    text = re.sub(r"https?://\S+", " ", text)
+    return len(WORD.findall(text.replace("_", " ")))
+
 
-    return result
+def listing_preview(body: str) -> str:
+    """The blog card's preview, as blog.js used to build it from the markdown:
+    the first line with image embeds removed, "..." when more follows. Inline
+    markdown is kept; the card renders it."""
+    content = body.strip()
+    first, newline, rest = content.partition("\n")
+    preview = re.sub(r"!\[\[(.+?)\]\]", "", first)
+    preview = re.sub(r"!\[.*?\]\(.*?\)", "", preview).strip()
+    return preview + "..." if newline and rest else preview
 
 
-def extract_song_of_the_day(filepath: Path) -> str | None:
-    """Extract the 'שיר היום' section from a post's markdown body."""
+def outline(body: str) -> List[List[Any]]:
+    """[[level, text], ...] for every heading, as generateTOC() in blog.js sees them."""
+    headings = []
+    for line in body.split("\n"):
+        match = HEADING.match(line.strip())
+        if match:
+            headings.append([len(match.group(1)), match.group(2).strip()])
+    return headings
+
+
+def image_source(post: Dict[str, Any]) -> str | None:
+    """Manifest key (posts/-relative path) or URL of the post's first image."""
+    match = FIRST_IMAGE.search(post["body"])
+    if not match:
+        return None
+    obsidian, markdown = match.groups()
+    ref = (obsidian or markdown).split("|")[0].strip()
+    if ref.startswith(("http://", "https://")):
+        return ref
+    rel_dir = Path(post["rel"]).parent
+    if obsidian:
+        return (rel_dir / "attachments" / ref).as_posix()
+    ref = ref.split("?")[0].split("#")[0]
+    if ref.startswith(("posts/", "/")):
+        return ref.lstrip("/").removeprefix("posts/")
+    return (rel_dir / ref).as_posix()
+
+
+def resolve_image(source: str | None, manifest: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Smallest variant (with its size and the placeholder colour) for a
+    manifest key; the original file otherwise."""
+    if not source:
+        return None
+    if source.startswith(("http://", "https://")):
+        return {"src": source}
+    entry = manifest.get(source)
+    if not (entry and entry.get("variants")):
+        return {"src": f"posts/{source}"}
+    smallest = min(entry["variants"], key=lambda v: v["w"])
+    height = round(entry["h"] * smallest["w"] / entry["w"])
+    image = {"src": smallest["path"], "w": smallest["w"], "h": height}
+    if entry.get("color"):
+        image["color"] = entry["color"]
+    return image
+
+
+def load_manifest() -> Dict[str, Any]:
     try:
-        with filepath.open("r", encoding="utf-8") as f:
-            content = f.read()
-
-        # Remove frontmatter if present
-        body_content = content
-        if content.startswith("---"):
-            end = content.find("---", 3)
-            if end != -1:
-                body_content = content[end + 3:].strip()
-
-        # Look for "שיר היום:" marker
-        song_marker = "שיר היום:"
-        index = body_content.find(song_marker)
-        if index == -1:
-            return None
-        # Extract text after the marker (up to next blank line or end)
-        after_marker = body_content[index + len(song_marker):].lstrip()
-        # Stop at first blank line or end of string
-        for i, c in enumerate(after_marker):
-            if c == "\n" and (i + 1 == len(after_marker) or after_marker[i + 1] == "\n"):
-                return after_marker[:i].strip()
-        return after_marker.strip()
-    except Exception as e:
-        print(f"\t[!] Error extracting song from {filepath}: {e}")
+        return json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def index_entry(post: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Return the posts/index.json entry for a corpus record, or None if unpublished."""
+    relative_path = post["rel"]
+    fm = post["fields"]
+    if post["error"]:
+        print(f"\t[!] Error parsing {relative_path}: {post['error']}")
+
+    title = fm["title"] or relative_path.replace(".md", "").replace("-", " ").title()
+    uploadto = fm["uploadto"]
+    if not (uploadto and "blog" in uploadto):
         return None
 
+    entry = {
+        "filename": relative_path,
+        "title": title,
+        "date": fm["date"],
+        "categories": fm["categories"],
+    }
+    if post["song_of_the_day"]:
+        entry["song_of_the_day"] = post["song_of_the_day"]
+    words = word_count(post["body"])
+    entry["excerpt"] = post["preview"]
+    entry["preview"] = listing_preview(post["body"])
+    entry["preview_html"] = MARKDOWN.render(entry["preview"])
+    entry["word_count"] = words
+    entry["reading_minutes"] = max(1, round(words / WORDS_PER_MINUTE))
+    headings = outline(post["body"])
+    if headings:
+        entry["outline"] = headings
+    return entry
 
-def get_markdown_files(directory: Path) -> List[Path]:
-    print(f"[ ] Scanning directory '{directory}' for markdown files")
-    md_files = [f for f in directory.rglob("*.md")]
-    print(f"[+] Found {len(md_files)} markdown files")
-    return sorted(md_files)
 
+def load_state() -> Dict[str, Any]:
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        data = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    if data.get("version") != STATE_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def save_state(files: Dict[str, Any]) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    STATE_FILE.write_text(
+        json.dumps({"version": STATE_VERSION, "files": files}, ensure_ascii=False),
+        encoding="utf-8",
+    )
 
-def build_index(posts: List[Dict[str, Any]]) -> None:
+
+def build_index(posts: List[Dict[str, Any]]) -> bool:
+    """Write index.json if its content changed; return whether it was written."""
+    content = json.dumps(posts, indent=2)
     try:
-        with INDEX_FILE.open("w", encoding="utf-8") as f:
-            json.dump(posts, f, indent=2)
+        if INDEX_FILE.exists() and INDEX_FILE.read_text(encoding="utf-8") == content:
+            print(f"[=] Index unchanged ({len(posts)} posts)")
+            return False
+        INDEX_FILE.write_text(content, encoding="utf-8")
         print(f"[+] Wrote index file with {len(posts)} posts to '{INDEX_FILE}'")
+        return True
     except Exception as e:
         print(f"[!] Failed to write index file: {e}")
+        return False
+
+
+def compact(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def category_key(category: str) -> str:
+    """File-safe key for a category; non-ASCII names fall back to a hash."""
+    slug = re.sub(r"[^a-z0-9]+", "-", category.strip().lower()).strip("-")
+    if slug and slug.isascii():
+        return slug
+    return hashlib.sha1(category.strip().lower().encode("utf-8")).hexdigest()[:10]
+
+
+def date_range(posts: List[Dict[str, Any]]) -> Dict[str, str]:
+    dates = [p["date"] for p in posts if p["date"]]
+    return {"newest": max(dates), "oldest": min(dates)} if dates else {}
+
+
+def build_shards(posts: List[Dict[str, Any]]) -> int:
+    """Write the posts/index/ slices; return how many files changed."""
+    ordered = sorted(posts, key=lambda p: p["date"] or "", reverse=True)
+    files = {"head.json": ordered[:HEAD_SIZE]}
+    manifest = {
+        "total": len(ordered),
+        "head": {"file": "head.json", "count": len(files["head.json"])},
+        "page_size": PAGE_SIZE,
+        "pages": [],
+        "categories": {},
+    }
 
+    for n, start in enumerate(range(0, len(ordered), PAGE_SIZE), 1):
+        page = ordered[start:start + PAGE_SIZE]
+        files[f"page-{n}.json"] = page
+        manifest["pages"].append({"file": f"page-{n}.json", "count": len(page), **date_range(page)})
 
-posts = []
+    by_category = {}
+    for post in ordered:
+        for category in post["categories"] or []:
+            # Case-insensitive like the blog's category filter; first spelling wins
+            name = str(category).strip()
+            by_category.setdefault(name.lower(), (name, []))[1].append(post)
+    for name, members in sorted(by_category.values()):
+        name_file = f"category-{category_key(name)}.json"
+        files[name_file] = members
+        manifest["categories"][name] = {"file": name_file, "count": len(members), **date_range(members)}
 
-for filepath in get_markdown_files(POSTS_DIR):
-    relative_path = filepath.relative_to(POSTS_DIR).as_posix()
-    print(f"[ ] Processing {relative_path}")
-    fm = parse_frontmatter(filepath)
+    files["manifest.json"] = manifest
+    SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    changed = 0
+    for name, data in files.items():
+        path = SHARD_DIR / name
+        content = compact(data) + "\n"
+        if not path.exists() or path.read_text(encoding="utf-8") != content:
+            path.write_text(content, encoding="utf-8")
+            changed += 1
+    for path in SHARD_DIR.glob("*.json"):
+        if path.name not in files:
+            path.unlink()
+            changed += 1
+    return changed
 
-    title = (
-        fm.get("title") or relative_path.replace(".md", "").replace("-", " ").title()
+
+def write_outputs(**values) -> None:
+    """Expose results to later workflow steps and the job summary."""
+    output_path = os.environ.get("GITHUB_OUTPUT")
+    if output_path:
+        with open(output_path, "a", encoding="utf-8") as f:
+            for key, value in values.items():
+                f.write(f"{key}={str(value).lower() if isinstance(value, bool) else value}\n")
+    summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_path:
+        with open(summary_path, "a", encoding="utf-8") as f:
+            f.write("## Post index\n")
+            f.write(f"- Added: {values['added']}\n")
+            f.write(f"- Updated: {values['updated']}\n")
+            f.write(f"- Removed: {values['removed']}\n")
+            f.write(f"- index.json {'rewritten' if values['changed'] else 'unchanged'}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--full", action="store_true",
+                        help="ignore stored state and re-extract every post")
+    parser.add_argument("--verbose", action="store_true", help="log every post")
+    args = parser.parse_args()
+
+    old = {} if args.full else load_state()
+    manifest = load_manifest()
+    files = {}
+    posts = []
+    added = updated = 0
+
+    for post in load_posts():
+        rel = post["rel"]
+        prev = old.get(rel)
+        if prev and prev["hash"] == post["hash"]:
+            entry, image = prev["entry"], prev["image"]
+        else:
+            entry = index_entry(post)
+            image = image_source(post) if entry else None
+            if prev:
+                updated += 1
+                print(f"[~] Updated: {rel}")
+            else:
+                added += 1
+                if old or args.verbose:
+                    print(f"[+] Added: {rel}")
+        if args.verbose and not entry:
+            print(f"\t[*] Skipped: {rel}")
+
+        files[rel] = {"hash": post["hash"], "entry": entry, "image": image}
+        if entry:
+            resolved = resolve_image(image, manifest)
+            posts.append({**entry, "image": resolved} if resolved else entry)
+
+    removed = [rel for rel in old if rel not in files]
+    for rel in removed:
+        print(f"[-] Removed: {rel}")
+
+    written = build_index(posts)
+    shards_changed = build_shards(posts)
+    if shards_changed:
+        print(f"[+] Updated {shards_changed} file(s) in '{SHARD_DIR}'")
+    save_state(files)
+
+    print(f"[+] {added} added, {updated} updated, {len(removed)} removed")
+    write_outputs(
+        changed=written or bool(shards_changed or added or updated or removed),
+        added=added,
+        updated=updated,
+        removed=len(removed),
     )
-    date = fm.get("date", "")
-    categories = fm.get("categories", [])
-    uploadto = fm.get("uploadto", [])
-
-    if uploadto and "blog" in uploadto:
-        entry = {
-            "filename": relative_path,
-            "title": title,
-            "date": date,
-            "categories": categories,
-        }
-        song = extract_song_of_the_day(filepath)
-        if song:
-            entry["song_of_the_day"] = song
-        posts.append(entry)
-    else:
-        print(f"\t[*] Skipped: {relative_path}")
-
-build_index(posts)
+
+
+if __name__ == "__main__":
+    main()
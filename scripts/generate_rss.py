@@ -1,5 +1,4 @@
 import json
-import re
 import sys
 from datetime import datetime, timezone
 from email.utils import format_datetime
@@ -15,35 +14,6 @@ FEED_DESCRIPTION = "Tomer Ben David's personal blog — travel, tech, and everyt
 MAX_ITEMS = 50
 
 
-def parse_post_preview(filepath: Path) -> str:
-    """Extract the first non-empty paragraph from a markdown file (after frontmatter)."""
-    try:
-        with filepath.open("r", encoding="utf-8") as f:
-            content = f.read()
-
-        # Strip frontmatter
-        if content.startswith("---"):
-            end = content.find("---", 3)
-            if end != -1:
-                content = content[end + 3:].strip()
-
-        # Remove markdown headings, images, and links; get first real paragraph
-        paragraphs = [p.strip() for p in content.split("\n\n") if p.strip()]
-        for para in paragraphs:
-            # Skip lines that are purely headings, images, or horizontal rules
-            clean = re.sub(r"^#{1,6}\s+", "", para)
-            clean = re.sub(r"!\[\[.*?\]\]", "", clean)  # Obsidian images
-            clean = re.sub(r"!\[.*?\]\(.*?\)", "", clean)  # Markdown images
-            clean = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", clean)  # Links → text
-            clean = re.sub(r"[*_`~]+", "", clean)  # Bold/italic/code
-            clean = clean.strip()
-            if clean and not clean.startswith("---"):
-                return clean[:300] + ("..." if len(clean) > 300 else "")
-    except Exception:
-        pass
-    return ""
-
-
 def parse_date(date_str: str) -> datetime:
     """Parse a post date string into a UTC datetime."""
     formats = [
@@ -87,9 +57,16 @@ def build_rss(posts: list) -> str:
         url = post_url(filename)
         guid = url
 
-        # Try to get a description from the post file
-        post_path = POSTS_DIR / filename
-        description = escape_xml(parse_post_preview(post_path)) if post_path.exists() else ""
+        description = escape_xml(post.get("excerpt", ""))
+
+        thumbnail = ""
+        image = post.get("image")
+        if image:
+            src = image["src"]
+            if not src.startswith(("http://", "https://")):
+                src = f"{SITE_URL}/{quote(src)}"
+            size = f' width="{image["w"]}" height="{image["h"]}"' if "w" in image else ""
+            thumbnail = f'\n    <media:thumbnail url="{escape_xml(src)}"{size}/>'
 
         categories = post.get("categories") or []
         category_tags = "\n      ".join(
@@ -101,14 +78,14 @@ def build_rss(posts: list) -> str:
     <link>{url}</link>
     <guid isPermaLink="true">{guid}</guid>
     <pubDate>{pub_date}</pubDate>
-    <description>{description}</description>
+    <description>{description}</description>{thumbnail}
     {category_tags}
   </item>""")
 
     items_xml = "\n".join(items)
 
     return f"""<?xml version="1.0" encoding="UTF-8"?>
-<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">
   <channel>
     <title>{FEED_TITLE}</title>
     <link>{SITE_URL}</link>
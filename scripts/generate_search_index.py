@@ -0,0 +1,180 @@
+"""
+Build the blog's full-text search index from published post bodies.
+
+Output: posts/search/
+  meta.json     {"version", "docs": [filename | null, ...], "shards": {key: terms}}
+  <key>.json    {term: [[doc_id, tf], ...]} for every term whose first
+                character has code point <key> (hex), so the browser fetches
+                only the shards its query words start with
+
+Normalization (mirrored exactly in js/blog.js: terms() by searchTokens() +
+stemTerm(), stem() by stemTerm() — change both together and bump
+INDEX_VERSION):
+  - lowercase; Hebrew niqqud/cantillation stripped
+  - tokens are runs of [a-z0-9] or Hebrew letters, 2+ characters
+  - Hebrew: up to two leading prefix letters (ו ה ב ל מ ש כ) dropped while
+    3+ letters remain
+  - English: light suffix stemming (plural -s/-ies, -ing, -ed, trailing -e)
+
+Incremental: .cache/search_state.json keeps each post's content hash and
+term counts, plus stable doc ids, so only added/modified posts are
+re-tokenized and unchanged shards are not rewritten.
+
+Run from repo root:
+  python scripts/generate_search_index.py [--full]
+"""
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+from post_corpus import REPO_ROOT, is_published, load_posts
+
+# Windows consoles default to cp1252; post filenames are Hebrew/UTF-8
+if sys.stdout.encoding and sys.stdout.encoding.lower() not in ("utf-8", "utf8"):
+    sys.stdout.reconfigure(encoding="utf-8")
+
+OUT_DIR = REPO_ROOT / "posts" / "search"
+META_FILE = OUT_DIR / "meta.json"
+STATE_FILE = REPO_ROOT / ".cache" / "search_state.json"
+INDEX_VERSION = 1
+
+NIQQUD = re.compile(r"[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4\u05C5\u05C7]")
+TOKEN = re.compile(r"[a-z0-9]+|[\u05D0-\u05EA]+")
+# Embeds, links' targets and bare URLs carry filenames, not content
+NOISE = re.compile(r"!\[\[.*?\]\]|\]\([^)]*\)|https?://\S+")
+HEBREW_PREFIXES = "והבלמשכ"
+MIN_TOKEN = 2
+
+
+def stem(token: str) -> str:
+    if "א" <= token[0] <= "ת":
+        i = 0
+        while i < 2 and len(token) - i > 3 and token[i] in HEBREW_PREFIXES:
+            i += 1
+        return token[i:]
+    if token.isdigit():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith("s") and not token.endswith(("ss", "us", "is")) and len(token) > 3:
+        token = token[:-1]
+    if token.endswith("ing") and len(token) > 5:
+        token = token[:-3]
+    elif token.endswith("ed") and len(token) > 4:
+        token = token[:-2]
+    if token.endswith("e") and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+def terms(text: str) -> list[str]:
+    text = NIQQUD.sub("", NOISE.sub(" ", text).lower())
+    return [stem(t) for t in TOKEN.findall(text) if len(t) >= MIN_TOKEN]
+
+
+def post_terms(post: dict) -> dict:
+    """Term frequencies for a post: its title counts alongside the body."""
+    fields = post["fields"]
+    text = " ".join([fields["title"] or "", " ".join(map(str, fields["categories"])), post["body"]])
+    return dict(Counter(terms(text)))
+
+
+def shard_key(term: str) -> str:
+    return format(ord(term[0]), "x")
+
+
+def load_state() -> dict:
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return state if state.get("version") == INDEX_VERSION else {}
+
+
+def save_state(state: dict) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    STATE_FILE.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+
+
+def assign_ids(rels: list[str], old_ids: dict) -> dict:
+    """Keep existing doc ids stable; new posts take freed or fresh ids.
+    Renumber from scratch once more than half the id space is holes."""
+    ids = {rel: old_ids[rel] for rel in rels if rel in old_ids}
+    size = max(ids.values(), default=-1) + 1
+    if size > 2 * max(len(rels), 1):
+        ids, size = {}, 0
+    free = sorted(set(range(size)) - set(ids.values()), reverse=True)
+    for rel in rels:
+        if rel not in ids:
+            ids[rel] = free.pop() if free else size
+            size = max(size, ids[rel] + 1)
+    return ids
+
+
+def write_if_changed(path: Path, data) -> bool:
+    content = json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n"
+    if path.exists() and path.read_text(encoding="utf-8") == content:
+        return False
+    path.write_text(content, encoding="utf-8")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the blog full-text search index.")
+    parser.add_argument("--full", action="store_true", help="re-tokenize every post")
+    args = parser.parse_args()
+
+    state = {} if args.full else load_state()
+    old_posts = state.get("posts", {})
+    posts_state = {}
+    tokenized = 0
+
+    for post in load_posts():
+        if not is_published(post):
+            continue
+        prev = old_posts.get(post["rel"])
+        if prev and prev["hash"] == post["hash"]:
+            posts_state[post["rel"]] = prev
+        else:
+            posts_state[post["rel"]] = {"hash": post["hash"], "terms": post_terms(post)}
+            tokenized += 1
+
+    ids = assign_ids(sorted(posts_state), state.get("ids", {}))
+    docs = [None] * (max(ids.values(), default=-1) + 1)
+    for rel, doc_id in ids.items():
+        docs[doc_id] = rel
+
+    shards = {}
+    for rel in sorted(posts_state, key=ids.get):
+        for term, tf in posts_state[rel]["terms"].items():
+            shards.setdefault(shard_key(term), {}).setdefault(term, []).append([ids[rel], tf])
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for key, postings in shards.items():
+        written += write_if_changed(OUT_DIR / f"{key}.json", dict(sorted(postings.items())))
+    for path in OUT_DIR.glob("*.json"):
+        if path != META_FILE and path.stem not in shards:
+            path.unlink()
+            written += 1
+    meta = {
+        "version": INDEX_VERSION,
+        "docs": docs,
+        "shards": {key: len(postings) for key, postings in sorted(shards.items())},
+    }
+    written += write_if_changed(META_FILE, meta)
+
+    save_state({"version": INDEX_VERSION, "ids": ids, "posts": posts_state})
+    removed = len(set(old_posts) - set(posts_state))
+    n_terms = sum(len(p) for p in shards.values())
+    print(f"[+] Search index: {len(posts_state)} posts ({tokenized} tokenized, {removed} removed), "
+          f"{n_terms} terms in {len(shards)} shards, {written} file(s) written")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,69 @@
 Geocode travel post locations using Nominatim (OpenStreetMap).
 
 Reads posts/index.json, extracts place names from travel post filenames,
-queries Nominatim, and writes results to posts/geocoded.json.
+queries a geocoder backend, and writes results to posts/geocoded.json.
+
+Backends (--backend):
+  nominatim  the public Nominatim API (default; 1 request / RATE_LIMIT s)
+  gazetteer  offline: scripts/travel_places.json and the country points in
+             scripts/countries.json, no network at all
+  http       any Nominatim-compatible /search endpoint at --url, e.g. a
+             self-hosted Nominatim (tests/scripts/ drives this backend against
+             an in-process stand-in)
 
 Incremental: only geocodes posts not already in the cache.
 Failed lookups (null) are retried on the next run in case the script improves.
 Intentional skips (no geographic query possible) are marked {skip: true}.
 
-Respects Nominatim's 1 request/second rate limit.
+Answers are also kept per query in .cache/geocode_queries.json (other
+backends: geocode_queries.<backend>.json; gitignored, restored by
+actions/cache in CI): query + country code ->
+coordinates, the effective query (after the country-only fallback), when it
+was asked and how many times in a row it found nothing. Hits never expire, so
+posts sharing a place name cost one request ever. Misses are asked again only
+after RETRY_AFTER_S, doubling with each further miss up to MAX_RETRY_AFTER_S,
+and network errors are not cached at all. A run with no new place names makes
+no requests.
+
+Requests go through a token bucket at the backend's rate (--rate), so only
+actual requests wait — cache hits and skips never sleep. Progress is
+checkpointed atomically (temp file + rename) to geocoded.json and the query
+cache every CHECKPOINT_EVERY requests and on exit, including interrupts and
+SIGTERM, so an interrupted backfill resumes where it stopped.
 
 Run from repo root:
   python scripts/geocode_travel_posts.py
+  python scripts/geocode_travel_posts.py --backend gazetteer
+  python scripts/geocode_travel_posts.py --backend http --url http://127.0.0.1:8080/search --out /tmp/geocoded.json
 """
 
+import argparse
 import json
+import os
 import re
+import signal
+import sys
 import time
 import urllib.parse
 import urllib.request
+from collections import namedtuple
+from functools import partial
 from pathlib import Path
 
 REPO_ROOT     = Path(__file__).resolve().parent.parent
 INDEX_FILE    = REPO_ROOT / "posts" / "index.json"
 TIMELINE_FILE = REPO_ROOT / "posts" / "timeline.json"
 OUT_FILE      = REPO_ROOT / "posts" / "geocoded.json"
+CACHE_DIR     = REPO_ROOT / ".cache"
+PLACES_FILE   = REPO_ROOT / "scripts" / "travel_places.json"
+COUNTRIES_FILE = REPO_ROOT / "scripts" / "countries.json"
 
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 USER_AGENT    = "tbd.codes-travel-geocoder/1.0 (https://tbd.codes)"
 RATE_LIMIT    = 1.1   # seconds between requests (Nominatim ToS: max 1/sec)
+CHECKPOINT_EVERY = 25   # requests between checkpoints of results + query cache
+RETRY_AFTER_S     = 24 * 3600        # first retry of a query that found nothing
+MAX_RETRY_AFTER_S = 90 * 24 * 3600   # backoff cap for repeated misses
 
 # ISO 3166-1 alpha-2 codes — used to restrict results to the right country
 COUNTRY_CODES = {
@@ -97,24 +133,147 @@ def extract_query(filename):
     return f"{place}, {country}", country_code
 
 
-def nominatim_geocode(query, country_code=None):
-    """Return (lat, lng) for query restricted to country_code, or None if not found."""
+# A geocoder: lookup(query, country_code) -> (lat, lng) or None.
+# rate is its request limit per second (None = unlimited).
+Backend = namedtuple("Backend", "name lookup rate")
+
+
+def nominatim_geocode(query, country_code=None, url=NOMINATIM_URL):
+    """Return (lat, lng) for query restricted to country_code, or None if not found.
+
+    Network and HTTP errors propagate, so they are never cached as a miss.
+    """
     params = {"q": query, "format": "json", "limit": 1, "addressdetails": 0}
     if country_code:
         params["countrycodes"] = country_code
-    url = f"{NOMINATIM_URL}?{urllib.parse.urlencode(params)}"
+    url = f"{url}?{urllib.parse.urlencode(params)}"
     req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            data = json.loads(resp.read().decode())
-        if data:
-            return round(float(data[0]["lat"]), 6), round(float(data[0]["lon"]), 6)
-    except Exception as e:
-        print(f"  Nominatim error for {query!r}: {e}")
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        data = json.loads(resp.read().decode())
+    if data:
+        return round(float(data[0]["lat"]), 6), round(float(data[0]["lon"]), 6)
     return None
 
 
+def load_gazetteer():
+    """Lower-case name -> (lat, lng): travel_places.json entries (underscores
+    read as spaces) and each country's first point (its centroid)."""
+    names = {}
+    for path, first in ((COUNTRIES_FILE, True), (PLACES_FILE, False)):
+        if not path.exists():
+            continue
+        for name, coords in json.loads(path.read_text(encoding="utf-8")).items():
+            lat, lng = coords[0] if first else coords
+            names.setdefault(name.lower().replace("_", " "), (lat, lng))
+    return names
+
+
+def gazetteer_geocode(names, query, country_code=None):
+    """Offline lookup of the query's place part ("pai, Thailand" -> "pai").
+    country_code is ignored: the gazetteer has one entry per name."""
+    place = query.split(",")[0].strip().lower().replace("_", " ")
+    return names.get(place)
+
+
+def make_backend(name, url=None, rate=None):
+    if name == "gazetteer":
+        return Backend(name, partial(gazetteer_geocode, load_gazetteer()), rate)
+    if name == "http":
+        return Backend(name, partial(nominatim_geocode, url=url), rate)
+    return Backend(name, nominatim_geocode, rate or 1 / RATE_LIMIT)
+
+
+class TokenBucket:
+    """At most `rate` acquisitions per second on average, bursting up to
+    `capacity`. acquire() sleeps only while the bucket is empty."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            time.sleep((1 - self.tokens) / self.rate)
+            self.tokens = 1
+            self.updated = time.monotonic()
+        self.tokens -= 1
+
+
+def geocode_query(backend, bucket, query, country_code):
+    """Look query up, falling back to the country alone when a city-level
+    query finds nothing. Returns (result, effective_query)."""
+    bucket.acquire()
+    result = backend.lookup(query, country_code)
+    if not result and ", " in query:
+        country_fallback = query.split(", ")[-1]
+        bucket.acquire()
+        result = backend.lookup(country_fallback, None)
+        if result:
+            return result, country_fallback
+    return result, query
+
+
+def query_key(query, country_code):
+    return f"{query}|{country_code or ''}"
+
+
+def query_cache_file(backend_name):
+    suffix = "" if backend_name == "nominatim" else f".{backend_name}"
+    return CACHE_DIR / f"geocode_queries{suffix}.json"
+
+
+def load_query_cache(path):
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def write_json_atomic(path, data, indent):
+    """Write via a temp file + rename, so a kill mid-write never leaves a
+    truncated file behind."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=indent, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def retry_after(misses):
+    """Seconds before a query that missed `misses` times in a row is asked again."""
+    return min(RETRY_AFTER_S * 2 ** max(misses - 1, 0), MAX_RETRY_AFTER_S)
+
+
+def is_fresh(entry, now):
+    """Whether a cached query answer can be used instead of asking again."""
+    if not entry:
+        return False
+    if entry.get("lat") is not None:
+        return True
+    return now - entry.get("at", 0) < retry_after(entry.get("misses", 1))
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Geocode travel posts into posts/geocoded.json.")
+    parser.add_argument("--backend", choices=["nominatim", "gazetteer", "http"], default="nominatim",
+                        help="geocoder to query (default nominatim)")
+    parser.add_argument("--url", help="http backend: Nominatim-compatible /search URL")
+    parser.add_argument("--rate", type=float, default=None, metavar="R",
+                        help=f"requests per second (default 1/{RATE_LIMIT} for nominatim, unlimited otherwise)")
+    parser.add_argument("--out", type=Path, default=OUT_FILE,
+                        help=f"results file (default {OUT_FILE.relative_to(REPO_ROOT)})")
+    args = parser.parse_args()
+    if args.backend == "http" and not args.url:
+        parser.error("--backend http needs --url")
+
     if not INDEX_FILE.exists():
         print(f"Index not found: {INDEX_FILE}")
         return
@@ -123,9 +282,10 @@ def main():
         posts = json.load(f)
 
     # Load existing cache
+    out_file = args.out
     geocoded = {}
-    if OUT_FILE.exists():
-        with OUT_FILE.open(encoding="utf-8") as f:
+    if out_file.exists():
+        with out_file.open(encoding="utf-8") as f:
             geocoded = json.load(f)
 
     # Build set of dates covered by timeline visits — those posts don't need geocoding
@@ -155,62 +315,78 @@ def main():
         print(f"All {len(travel)} travel posts already geocoded ({resolved} resolved). Nothing to do.")
         return
 
-    print(f"Geocoding {len(to_geocode)} posts (cache has {len(geocoded)}, "
+    backend = make_backend(args.backend, args.url, args.rate)
+    bucket = TokenBucket(backend.rate)
+    cache_file = query_cache_file(backend.name)
+    query_cache = load_query_cache(cache_file)
+
+    def checkpoint():
+        write_json_atomic(cache_file, query_cache, indent=1)
+        write_json_atomic(out_file, geocoded, indent=2)
+
+    # CI cancels with SIGTERM: unwind through the finally below and checkpoint
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    print(f"Geocoding {len(to_geocode)} posts via {backend.name} (cache has {len(geocoded)}, "
           f"timeline covers {len(timeline_dates)} dates)...")
     added = 0
     skipped = 0
-    query_cache = {}  # (query, country_code) -> (result, effective_query)
-
-    for i, post in enumerate(to_geocode):
-        fn = post["filename"]
-        query, country_code = extract_query(fn)
-
-        if not query:
-            print(f"  [{i+1}/{len(to_geocode)}] SKIP (no location): {fn}")
-            geocoded[fn] = {"skip": True}
-            skipped += 1
-            continue
+    requests = 0
+    now = int(time.time())
 
-        print(f"  [{i+1}/{len(to_geocode)}] {fn!r} -> {query!r}", end=" ... ", flush=True)
-
-        cache_key = (query, country_code)
-        if cache_key in query_cache:
-            result, effective_query = query_cache[cache_key]
-            cached = True
-        else:
-            result = nominatim_geocode(query, country_code)
-            effective_query = query
-
-            # If city-level query failed, retry with country-only fallback
-            if not result and ", " in query:
-                time.sleep(RATE_LIMIT)
-                country_fallback = query.split(", ")[-1]
-                result = nominatim_geocode(country_fallback, None)
+    try:
+        for i, post in enumerate(to_geocode):
+            fn = post["filename"]
+            query, country_code = extract_query(fn)
+
+            if not query:
+                print(f"  [{i+1}/{len(to_geocode)}] SKIP (no location): {fn}")
+                geocoded[fn] = {"skip": True}
+                skipped += 1
+                continue
+
+            print(f"  [{i+1}/{len(to_geocode)}] {fn!r} -> {query!r}", end=" ... ", flush=True)
+
+            key = query_key(query, country_code)
+            entry = query_cache.get(key)
+            cached = is_fresh(entry, now)
+            if not cached:
+                requests += 1
+                if requests % CHECKPOINT_EVERY == 0:
+                    checkpoint()
+                try:
+                    result, effective_query = geocode_query(backend, bucket, query, country_code)
+                except Exception as e:
+                    # Transient — not a miss; asked again on the next run
+                    print(f"{backend.name} error: {e}")
+                    geocoded.setdefault(fn, None)
+                    skipped += 1
+                    continue
+                misses = 0 if result else (entry or {}).get("misses", 0) + 1
+                entry = {"lat": None, "lng": None, "query": effective_query, "at": now, "misses": misses}
                 if result:
-                    effective_query = country_fallback
-
-            query_cache[cache_key] = (result, effective_query)
-            time.sleep(RATE_LIMIT)
-            cached = False
-
-        if result:
-            lat, lng = result
-            geocoded[fn] = {"lat": lat, "lng": lng, "query": effective_query}
-            print(f"({lat}, {lng})" + (" [cached]" if cached else ""))
-            added += 1
-        else:
-            geocoded[fn] = None   # mark as failed — will retry on next run
-            print("not found" + (" [cached]" if cached else ""))
-            skipped += 1
-
-    OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with OUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(geocoded, f, indent=2, ensure_ascii=False)
+                    entry["lat"], entry["lng"] = result
+                query_cache[key] = entry
+
+            result = (entry["lat"], entry["lng"]) if entry["lat"] is not None else None
+            effective_query = entry["query"]
+            if result:
+                lat, lng = result
+                geocoded[fn] = {"lat": lat, "lng": lng, "query": effective_query}
+                print(f"({lat}, {lng})" + (" [cached]" if cached else ""))
+                added += 1
+            else:
+                geocoded[fn] = None   # mark as failed — the query cache decides when to ask again
+                retry = time.strftime("%Y-%m-%d", time.gmtime(entry["at"] + retry_after(entry["misses"])))
+                print("not found" + (f" [cached, retry after {retry}]" if cached else ""))
+                skipped += 1
+    finally:
+        checkpoint()
 
     resolved = sum(1 for v in geocoded.values() if isinstance(v, dict) and "lat" in v)
-    print(f"\nDone. Added {added}, skipped/failed {skipped}. "
+    print(f"\nDone. Added {added}, skipped/failed {skipped}, {requests} lookup(s) sent. "
           f"Resolved: {resolved}/{len(travel)} travel posts.")
-    print(f"Output: {OUT_FILE}")
+    print(f"Output: {out_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+page_weight.py — estimate what each published post costs to download and
+flag the heavy ones.
+
+Per post (from posts/index.json + the markdown + assets/img/manifest.json):
+  - Post body bytes: the pre-rendered posts/html/ fragment the post view
+    loads, or the markdown file when there is none
+  - Image bytes as blog.js serves them, for an 800 px and a 1600 px
+    viewport: the srcset variant the browser would pick for that width
+  - Unconverted GIFs and originals with no variant (full file size)
+  - Missing / remote images are counted separately, not sized
+
+Run from repo root:
+  python scripts/page_weight.py                 # report, never fails
+  python scripts/page_weight.py --budget-1600 3000 --top 20
+  python scripts/page_weight.py --strict        # exit 1 if any post is over budget
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from post_corpus import load_posts
+
+# Windows consoles default to cp1252; post filenames are Hebrew/UTF-8
+if sys.stdout.encoding and sys.stdout.encoding.lower() not in ("utf-8", "utf8"):
+    sys.stdout.reconfigure(encoding="utf-8")
+
+POSTS_DIR = Path("posts")
+INDEX_FILE = POSTS_DIR / "index.json"
+HTML_DIR = POSTS_DIR / "html"
+MANIFEST_FILE = Path("assets") / "img" / "manifest.json"
+VIEWPORTS = [800, 1600]
+DEFAULT_BUDGETS_KB = {800: 1500, 1600: 3000}
+
+
+def pick_variant(variants, width):
+    """Mirror srcset selection: smallest variant at least `width` wide, else the largest."""
+    fitting = [v for v in variants if v["w"] >= width]
+    return min(fitting, key=lambda v: v["w"]) if fitting else max(variants, key=lambda v: v["w"])
+
+
+def file_size(path: Path):
+    try:
+        return path.stat().st_size
+    except OSError:
+        return None
+
+
+def image_cost(post, kind, ref, manifest):
+    """Return ({viewport: bytes}, label) for one image ref; label is None when
+    served from a variant, else 'gif', 'original', 'remote' or 'missing'."""
+    ref = ref.split("?")[0].split("#")[0].split("|")[0].strip()
+    if ref.startswith(("http://", "https://")):
+        return {w: 0 for w in VIEWPORTS}, "remote"
+
+    post_dir = post["path"].parent
+    if kind == "obsidian":
+        rel_dir = Path(post["rel"]).parent
+        src_key = (rel_dir / "attachments" / ref).as_posix()
+        src_path = post_dir / "attachments" / ref
+    elif ref.startswith(("posts/", "/")):
+        src_path = Path(ref.lstrip("/"))
+        src_key = None
+    else:
+        src_path = post_dir / ref
+        src_key = None
+
+    entry = manifest.get(src_key) if src_key else None
+    if entry and entry.get("variants"):
+        costs = {}
+        for width in VIEWPORTS:
+            size = file_size(Path(pick_variant(entry["variants"], width)["path"]))
+            costs[width] = size or 0
+        return costs, None
+
+    size = file_size(src_path)
+    if size is None:
+        return {w: 0 for w in VIEWPORTS}, "missing"
+    label = "gif" if src_path.suffix.lower() == ".gif" else "original"
+    return {w: size for w in VIEWPORTS}, label
+
+
+def measure(post, manifest):
+    body = file_size(HTML_DIR / Path(post["rel"]).with_suffix(".html"))
+    totals = {w: body or post["size"] for w in VIEWPORTS}
+    notes = {}
+    for kind, ref in post["image_refs"]:
+        costs, label = image_cost(post, kind, ref, manifest)
+        for width in VIEWPORTS:
+            totals[width] += costs[width]
+        if label:
+            notes[label] = notes.get(label, 0) + 1
+    return totals, notes
+
+
+def kb(n):
+    return f"{n / 1024:,.0f} KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-post page weight report.")
+    for width in VIEWPORTS:
+        parser.add_argument(f"--budget-{width}", type=int, default=DEFAULT_BUDGETS_KB[width],
+                            metavar="KB", help=f"budget at a {width} px viewport "
+                            f"(default {DEFAULT_BUDGETS_KB[width]} KB)")
+    parser.add_argument("--top", type=int, default=15, help="heaviest posts to list")
+    parser.add_argument("--strict", action="store_true", help="exit 1 if any post is over budget")
+    args = parser.parse_args()
+    budgets = {w: getattr(args, f"budget_{w}") * 1024 for w in VIEWPORTS}
+
+    if not INDEX_FILE.exists():
+        print(f"[!] Index file not found: {INDEX_FILE}. Run from repo root.")
+        sys.exit(1)
+    published = {p["filename"] for p in json.loads(INDEX_FILE.read_text(encoding="utf-8"))}
+    manifest = {}
+    if MANIFEST_FILE.exists():
+        manifest = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+
+    rows = []
+    for post in load_posts():
+        if post["rel"] not in published:
+            continue
+        totals, notes = measure(post, manifest)
+        over = [w for w in VIEWPORTS if totals[w] > budgets[w]]
+        rows.append((post["rel"], totals, notes, over))
+
+    big = max(VIEWPORTS)
+    rows.sort(key=lambda r: r[1][big], reverse=True)
+    over_budget = [r for r in rows if r[3]]
+    total = {w: sum(r[1][w] for r in rows) for w in VIEWPORTS}
+
+    print(f"Page weight for {len(rows)} posts "
+          + ", ".join(f"@{w}px: total {kb(total[w])}, budget {kb(budgets[w])}" for w in VIEWPORTS))
+    print()
+    print(f"Heaviest {min(args.top, len(rows))}:")
+    for rel, totals, notes, over in rows[:args.top]:
+        flag = "!" if over else " "
+        sizes = "  ".join(f"{kb(totals[w]):>9}" for w in VIEWPORTS)
+        extra = ", ".join(f"{n} {label}" for label, n in sorted(notes.items()))
+        print(f" {flag} {sizes}  {rel}" + (f"  ({extra})" if extra else ""))
+    print()
+    if over_budget:
+        print(f"[~] {len(over_budget)} post(s) over budget")
+    else:
+        print("[+] All posts within budget")
+
+    summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_path:
+        with open(summary_path, "a", encoding="utf-8") as f:
+            f.write("## Page weight\n")
+            for w in VIEWPORTS:
+                f.write(f"- @{w}px: total {kb(total[w])}, budget {kb(budgets[w])} per post\n")
+            f.write(f"- Over budget: {len(over_budget)}\n")
+            for rel, totals, notes, over in over_budget:
+                sizes = " / ".join(kb(totals[w]) for w in VIEWPORTS)
+                f.write(f"  - ⚠️ `{rel}` — {sizes}\n")
+
+    if args.strict and over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
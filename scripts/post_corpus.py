@@ -0,0 +1,243 @@
+"""Parse-once access to the markdown posts under posts/.
+
+Every generator (index, RSS, stats, health check) needs the same things from
+a post: its frontmatter, its body, the images it embeds, the song of the day
+and a preview paragraph. This module extracts all of them in a single read
+per file and keeps the results in a persistent cache so a run only re-parses
+posts that actually changed.
+
+Cache: .cache/post_corpus.json (gitignored; restored by actions/cache in CI).
+A cached record is reused when the file's size+mtime match; if the stat
+signature moved (fresh checkouts and rsync touch mtimes) the file is hashed
+and the record is still reused when the SHA-1 is unchanged. Only files whose
+content changed are re-parsed.
+
+Usage (scripts run from repo root put scripts/ on sys.path):
+    from post_corpus import load_posts
+    for post in load_posts():
+        ...
+"""
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+POSTS_DIR = REPO_ROOT / "posts"
+CACHE_FILE = REPO_ROOT / ".cache" / "post_corpus.json"
+# Bump whenever the extracted record shape or parsing rules change
+CACHE_VERSION = 1
+
+FRONTMATTER_KEYS = ["title", "date", "categories", "uploadto"]
+SONG_MARKER = "שיר היום:"
+PREVIEW_CHARS = 300
+
+
+def split_frontmatter(text: str):
+    """Return (frontmatter_text, body). frontmatter_text is None when absent.
+
+    Raises ValueError when an opening '---' has no closing delimiter.
+    """
+    if not text.startswith("---"):
+        return None, text
+    end = text.find("---", 3)
+    if end == -1:
+        raise ValueError("unterminated frontmatter")
+    return text[3:end], text[end + 3:].strip()
+
+
+def _jsonable(value):
+    """YAML yields date/datetime objects; store their str() so cached and
+    freshly parsed records are indistinguishable."""
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def normalize_fields(fm: dict) -> dict:
+    """Normalize title/date/categories/uploadto the way posts/index.json does."""
+    result = {}
+    for key in FRONTMATTER_KEYS:
+        value = fm.get(key, None)
+        if key == "date":
+            result[key] = str(value).strip().replace("T", " ") if value else ""
+        elif key == "categories":
+            if isinstance(value, str):
+                result[key] = [item.strip() for item in value.split(",")]
+            elif isinstance(value, list):
+                result[key] = value
+            else:
+                result[key] = []
+        elif key == "uploadto":
+            if isinstance(value, str):
+                result[key] = [item.strip().lower() for item in value.split(",")]
+            elif isinstance(value, list):
+                result[key] = [str(v).strip().lower() for v in value]
+            else:
+                result[key] = []
+        else:
+            result[key] = str(value).strip() if value else ""
+    return result
+
+
+def get_image_refs(body: str) -> list:
+    """Extract [kind, ref] image refs; kind is 'obsidian' or 'markdown'."""
+    refs = []
+    # Obsidian embeds: ![[filename.jpg]] or ![[filename.jpg|300]]
+    refs += [["obsidian", m] for m in re.findall(r"!\[\[(.+?)\]\]", body)]
+    # Standard markdown images: ![alt](path)
+    refs += [["markdown", m] for m in re.findall(r"!\[.*?\]\((.+?)\)", body)]
+    return refs
+
+
+def extract_song_of_the_day(body: str) -> str | None:
+    """Extract the 'שיר היום' section from a post's markdown body."""
+    index = body.find(SONG_MARKER)
+    if index == -1:
+        return None
+    # Extract text after the marker (up to next blank line or end)
+    after_marker = body[index + len(SONG_MARKER):].lstrip()
+    for i, c in enumerate(after_marker):
+        if c == "\n" and (i + 1 == len(after_marker) or after_marker[i + 1] == "\n"):
+            return after_marker[:i].strip()
+    return after_marker.strip()
+
+
+def extract_preview(body: str) -> str:
+    """Return the first real paragraph of the body, stripped of markdown."""
+    paragraphs = [p.strip() for p in body.split("\n\n") if p.strip()]
+    for para in paragraphs:
+        # Skip lines that are purely headings, images, or horizontal rules
+        clean = re.sub(r"^#{1,6}\s+", "", para)
+        clean = re.sub(r"!\[\[.*?\]\]", "", clean)  # Obsidian images
+        clean = re.sub(r"!\[.*?\]\(.*?\)", "", clean)  # Markdown images
+        clean = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", clean)  # Links → text
+        clean = re.sub(r"[*_`~]+", "", clean)  # Bold/italic/code
+        clean = clean.strip()
+        if clean and not clean.startswith("---"):
+            return clean[:PREVIEW_CHARS] + ("..." if len(clean) > PREVIEW_CHARS else "")
+    return ""
+
+
+def parse_post(rel: str, raw: bytes) -> dict:
+    """Build the cacheable record for one post from its raw bytes.
+
+    frontmatter is None (and error set) when the YAML block is malformed or the
+    file can't be decoded; {} when the post simply has no frontmatter.
+    """
+    record = {
+        "rel": rel,
+        "frontmatter": {},
+        "fields": normalize_fields({}),
+        "error": None,
+        "body": "",
+        "image_refs": [],
+        "song_of_the_day": None,
+        "preview": "",
+    }
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError as e:
+        record["frontmatter"] = None
+        record["error"] = str(e)
+        return record
+
+    try:
+        fm_text, body = split_frontmatter(text)
+        fm = yaml.safe_load(fm_text) if fm_text is not None else {}
+        if fm is None:
+            fm = {}
+        if not isinstance(fm, dict):
+            raise ValueError("frontmatter is not a mapping")
+    except (ValueError, yaml.YAMLError) as e:
+        record["frontmatter"] = None
+        record["error"] = str(e)
+        record["body"] = text
+        return record
+
+    fm = _jsonable(fm)
+    record["frontmatter"] = fm
+    record["fields"] = normalize_fields(fm)
+    record["body"] = body
+    record["image_refs"] = get_image_refs(body)
+    record["song_of_the_day"] = extract_song_of_the_day(body)
+    record["preview"] = extract_preview(body)
+    return record
+
+
+def is_published(post: dict) -> bool:
+    return "blog" in post["fields"]["uploadto"]
+
+
+def _load_cache(cache_file: Path) -> dict:
+    if not cache_file.exists():
+        return {}
+    try:
+        data = json.loads(cache_file.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("posts", {})
+
+
+def _save_cache(cache_file: Path, entries: dict) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix(".tmp")
+    tmp.write_text(
+        json.dumps({"version": CACHE_VERSION, "posts": entries}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    tmp.replace(cache_file)
+
+
+def load_posts(posts_dir: Path = POSTS_DIR, cache_file: Path | None = CACHE_FILE,
+               verbose: bool = True) -> list[dict]:
+    """Return one record per posts/**/*.md, sorted by relative path.
+
+    Each record has rel, path, size, mtime_ns, hash, frontmatter, fields,
+    error, body, image_refs, song_of_the_day and preview. Pass
+    cache_file=None to bypass the persistent cache.
+    """
+    cache = _load_cache(cache_file) if cache_file else {}
+    entries = {}
+    posts = []
+    hits = rehashed = parsed = 0
+
+    for path in sorted(posts_dir.rglob("*.md")):
+        rel = path.relative_to(posts_dir).as_posix()
+        st = path.stat()
+        entry = cache.get(rel)
+
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            hits += 1
+        else:
+            raw = path.read_bytes()
+            digest = hashlib.sha1(raw).hexdigest()
+            if entry and entry["hash"] == digest:
+                rehashed += 1
+            else:
+                entry = {"hash": digest, "record": parse_post(rel, raw)}
+                parsed += 1
+            entry = {**entry, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+        entries[rel] = entry
+        posts.append({
+            **entry["record"],
+            "path": path,
+            "size": entry["size"],
+            "mtime_ns": entry["mtime_ns"],
+            "hash": entry["hash"],
+        })
+
+    if cache_file and (parsed or rehashed or entries.keys() != cache.keys()):
+        try:
+            _save_cache(cache_file, entries)
+        except OSError as e:
+            print(f"[!] Could not write corpus cache {cache_file}: {e}", file=sys.stderr)
+
+    if verbose:
+        print(f"[+] Corpus: {len(posts)} posts ({parsed} parsed, {rehashed} rehashed, "
+              f"{hits} cached)", file=sys.stderr)
+    return posts
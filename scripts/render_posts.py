@@ -0,0 +1,214 @@
+"""
+Pre-render every published post to an HTML fragment under posts/html/.
+
+posts/html/<post path>.html holds exactly what blog.js would otherwise build
+in the browser from posts/<post path>.md: Obsidian ![[...]] embeds replaced
+by <img srcset> / <video> from assets/img/manifest.json (lazy loading,
+width/height, placeholder background), the markdown rendered with the same
+GFM dialect marked uses, headings given the ids the TOC links to and tables
+wrapped in .table-scroll. The post view injects the fragment as-is and only
+falls back to fetching the markdown + marked when the fragment is missing;
+scripts/check_render_parity.py keeps the two renderings in step.
+
+Cached by content: .cache/render_state.json stores, per post, a key over the
+post's SHA-1, the manifest entries its embeds resolve to and RENDER_VERSION.
+Only posts whose key moved are re-rendered; fragments of posts that are gone
+or unpublished are removed.
+
+Requires markdown-it-py with linkify (pip install "markdown-it-py[linkify]").
+
+Run from repo root:
+  python scripts/render_posts.py [--full]
+"""
+import argparse
+import hashlib
+import html
+import json
+import re
+import sys
+from pathlib import Path
+
+from markdown_it import MarkdownIt
+
+from post_corpus import REPO_ROOT, is_published, load_posts
+
+# Windows consoles default to cp1252; post filenames are Hebrew/UTF-8
+if sys.stdout.encoding and sys.stdout.encoding.lower() not in ("utf-8", "utf8"):
+    sys.stdout.reconfigure(encoding="utf-8")
+
+OUT_DIR = REPO_ROOT / "posts" / "html"
+MANIFEST_FILE = REPO_ROOT / "assets" / "img" / "manifest.json"
+STATE_FILE = REPO_ROOT / ".cache" / "render_state.json"
+# Bump whenever the generated HTML changes for the same input
+RENDER_VERSION = 2
+
+EMBED = re.compile(r"!\[\[(.+?)\]\]")
+ALLOWED_EXT = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg"}
+SIZES = "(max-width: 900px) 100vw, 800px"
+
+
+def attr(value) -> str:
+    return html.escape(str(value), quote=True)
+
+
+def embed_key(rel: str, filename: str) -> str | None:
+    """Manifest key for an embed, or None when blog.js would leave it as text."""
+    filename = filename.strip()
+    if Path(filename).suffix.lower() not in ALLOWED_EXT:
+        return None
+    post_dir = "/".join(rel.strip().split("/")[:-1])
+    return f"{post_dir}/attachments/{filename}"
+
+
+def embed_html(key: str, filename: str, entry: dict | None) -> str:
+    """Mirror of the ![[...]] replacement in renderFullPost() (js/blog.js)."""
+    name = attr(filename.strip())
+    orig = attr(f"posts/{key}")
+    if entry and entry.get("mp4"):
+        mp4 = entry["mp4"][-1]
+        return (f"<video autoplay loop muted playsinline preload=\"metadata\" width='{entry['w']}' "
+                f"height='{entry['h']}' aria-label='{name}' style='max-width:100%;height:auto;'>"
+                f"<source src='{attr(mp4['path'])}' type='video/mp4'>"
+                f"<img src='{orig}' alt='{name}' loading=\"lazy\"></video>")
+    if entry and entry.get("variants"):
+        srcset = ", ".join(f"{v['path']} {v['w']}w" for v in entry["variants"])
+        lqip = f"url({entry['lqip']}) center/cover no-repeat" if entry.get("lqip") else None
+        background = " ".join(filter(None, [entry.get("color"), lqip]))
+        placeholder = f"background:{background};" if background else ""
+        return (f"<img src='{orig}' srcset='{attr(srcset)}' sizes='{SIZES}' width='{entry['w']}' "
+                f"height='{entry['h']}' alt='{name}' loading=\"lazy\" decoding=\"async\" "
+                f"style='max-width:100%;height:auto;{placeholder}'>")
+    return f"<img src='{orig}' alt='{name}' loading=\"lazy\" style='max-width:100%;'>"
+
+
+def embed_entries(post: dict, manifest: dict) -> dict:
+    """{key: manifest entry or None} for every image embed in the post."""
+    entries = {}
+    for filename in EMBED.findall(post["body"]):
+        key = embed_key(post["rel"], filename)
+        if key:
+            entries[key] = manifest.get(key)
+    return entries
+
+
+def heading_slug(text: str) -> str:
+    """Same slug as parseMarkdownWithIDs()/generateTOC() in js/blog.js."""
+    return re.sub(r"\s+", "-", re.sub(r"[^a-z0-9\s-]", "", text.lower()))
+
+
+def make_renderer(post_view: bool = True) -> MarkdownIt:
+    """markdown-it configured to match marked. post_view adds what the post
+    view layers on top (heading ids, table wrappers); without it the output
+    is plain marked, as the listing cards use."""
+    md = MarkdownIt("gfm-like", {"xhtmlOut": False})
+    # No schemeless autolinks: marked leaves "בtrip.com" as text (bare www.
+    # hosts, which marked would link, are rare enough in posts to ignore)
+    md.linkify.set({"fuzzy_link": False})
+
+    def heading_open(self, tokens, idx, options, env):
+        inline = tokens[idx + 1]
+        text = "".join(t.content for t in inline.children or [] if t.type in ("text", "code_inline"))
+        tokens[idx].attrSet("id", heading_slug(text))
+        return self.renderToken(tokens, idx, options, env)
+
+    def table_open(self, tokens, idx, options, env):
+        return '<div class="table-scroll">' + self.renderToken(tokens, idx, options, env)
+
+    def table_close(self, tokens, idx, options, env):
+        return self.renderToken(tokens, idx, options, env) + "</div>"
+
+    # ~~x~~ is <s> in markdown-it but <del> in marked
+    def s_open(self, tokens, idx, options, env):
+        return "<del>"
+
+    def s_close(self, tokens, idx, options, env):
+        return "</del>"
+
+    md.add_render_rule("s_open", s_open)
+    md.add_render_rule("s_close", s_close)
+    if post_view:
+        md.add_render_rule("heading_open", heading_open)
+        md.add_render_rule("table_open", table_open)
+        md.add_render_rule("table_close", table_close)
+    return md
+
+
+def embed_source(post: dict, entries: dict) -> str:
+    """The post's markdown with image embeds replaced, as marked sees it."""
+    def replace(match):
+        key = embed_key(post["rel"], match.group(1))
+        return embed_html(key, match.group(1), entries.get(key)) if key else match.group(0)
+
+    return EMBED.sub(replace, post["body"])
+
+
+def render(md: MarkdownIt, post: dict, entries: dict) -> str:
+    return md.render(embed_source(post, entries))
+
+
+def render_key(post: dict, entries: dict) -> str:
+    payload = json.dumps([RENDER_VERSION, post["hash"], entries], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def fragment_path(rel: str) -> Path:
+    return OUT_DIR / Path(rel).with_suffix(".html")
+
+
+def load_state() -> dict:
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def save_state(state: dict) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    STATE_FILE.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render published posts to HTML fragments.")
+    parser.add_argument("--full", action="store_true", help="re-render every post")
+    args = parser.parse_args()
+
+    manifest = {}
+    if MANIFEST_FILE.exists():
+        manifest = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+    old = {} if args.full else load_state()
+    md = make_renderer()
+    state = {}
+    rendered = 0
+
+    for post in load_posts():
+        if not is_published(post):
+            continue
+        rel = post["rel"]
+        entries = embed_entries(post, manifest)
+        key = render_key(post, entries)
+        out = fragment_path(rel)
+        if old.get(rel) != key or not out.exists():
+            out.parent.mkdir(parents=True, exist_ok=True)
+            out.write_text(render(md, post, entries), encoding="utf-8")
+            rendered += 1
+        state[rel] = key
+
+    expected = {fragment_path(rel) for rel in state}
+    removed = 0
+    for path in sorted(OUT_DIR.rglob("*.html")) if OUT_DIR.exists() else []:
+        if path not in expected:
+            path.unlink()
+            removed += 1
+    for path in sorted(OUT_DIR.rglob("*"), reverse=True) if OUT_DIR.exists() else []:
+        if path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+
+    save_state(state)
+    print(f"[+] Rendered {rendered} of {len(state)} posts to '{OUT_DIR.relative_to(REPO_ROOT)}'"
+          f"{f', removed {removed}' if removed else ''}")
+
+
+if __name__ == "__main__":
+    main()
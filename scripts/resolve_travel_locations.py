@@ -0,0 +1,183 @@
+"""
+Resolve every travel post to map coordinates at build time.
+
+Writes posts/resolved_locations.json — { filename: {lat, lng, source} | null }
+for every travel post in posts/index.json, in index order. The travel map
+places markers straight from it and check_health.py reads it to flag
+unmappable posts, so neither re-joins the raw sources.
+
+Resolution mirrors resolveCoords() in js/travel.js (keep them in sync):
+  1. posts/locations.json  — manual override                ("manual")
+  2. posts/timeline.json   — the post date's visits         ("timeline")
+       with a geocoded hint: the visit within dist2 < 2 of it; else the last
+       visit near (dist2 < 50) any geocoded post of the same country; else
+       all visits are abroad (flight day) and the geocoded point wins
+       ("geocoded", flight_day: true)
+       without a hint: the last in-country visit, else the day's last visit
+  3. posts/geocoded.json   — Nominatim build-time cache     ("geocoded")
+dist2 is squared degrees, as in the browser. A geocoded entry without
+coordinates ({skip: true}) counts as no hint.
+
+Run from repo root (after geocode_travel_posts.py):
+  python scripts/resolve_travel_locations.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Windows consoles default to cp1252; post filenames are Hebrew/UTF-8
+if sys.stdout.encoding and sys.stdout.encoding.lower() not in ("utf-8", "utf8"):
+    sys.stdout.reconfigure(encoding="utf-8")
+
+REPO_ROOT      = Path(__file__).resolve().parent.parent
+INDEX_FILE     = REPO_ROOT / "posts" / "index.json"
+LOCATIONS_FILE = REPO_ROOT / "posts" / "locations.json"
+TIMELINE_FILE  = REPO_ROOT / "posts" / "timeline.json"
+GEOCODED_FILE  = REPO_ROOT / "posts" / "geocoded.json"
+OUT_FILE       = REPO_ROOT / "posts" / "resolved_locations.json"
+
+SAME_CITY_DIST2 = 2
+SAME_COUNTRY_DIST2 = 50
+
+
+def load_json(path, fallback):
+    if not path.exists():
+        return fallback
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return fallback
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def has_coords(entry):
+    return isinstance(entry, dict) and is_number(entry.get("lat")) and is_number(entry.get("lng"))
+
+
+def dist2(lat1, lng1, lat2, lng2):
+    dlat, dlng = lat1 - lat2, lng1 - lng2
+    return dlat * dlat + dlng * dlng
+
+
+def post_date(post):
+    """TbdData.postDateStr: date part of the index's "YYYY-MM-DD HH:MM"."""
+    return (post.get("date") or "").split(" ")[0]
+
+
+def is_travel(post):
+    cats = post.get("categories") or ([post["category"]] if post.get("category") else [])
+    return any((c or "").lower() == "travel" for c in cats)
+
+
+def get_country(post):
+    """TbdData.getCountry: first non-"travel" category, else the parent folder."""
+    for c in post.get("categories") or []:
+        c = (c or "").strip()
+        if c and c.lower() != "travel":
+            return c
+    parts = (post.get("filename") or "").split("/")
+    return parts[-2] if len(parts) >= 3 else ""
+
+
+def visits_by_date(timeline):
+    """date -> [(lat, lng)] of every timeline visit, in timeline order."""
+    by_date = {}
+    for pt in timeline:
+        if pt.get("type") != "visit":
+            continue
+        d = pt.get("date") or (pt.get("timestamp") or "").split("T")[0]
+        if d and is_number(pt.get("lat")) and is_number(pt.get("lng")):
+            by_date.setdefault(d, []).append((pt["lat"], pt["lng"]))
+    return by_date
+
+
+def country_geo_coords(travel, geocoded):
+    """country -> [(lat, lng)] of its geocoded posts (geocoded.json only)."""
+    coords = {}
+    for post in travel:
+        g = geocoded.get(post.get("filename") or "")
+        if not has_coords(g):
+            continue
+        c = get_country(post)
+        if c:
+            coords.setdefault(c, []).append((g["lat"], g["lng"]))
+    return coords
+
+
+def resolve_post(post, manual, timeline_by_date, geocoded, country_coords):
+    """Mirror of resolveCoords(): {lat, lng, source[, flight_day]} or None."""
+    filename = post.get("filename") or ""
+    entry = manual.get(filename)
+    if has_coords(entry):
+        return {"lat": entry["lat"], "lng": entry["lng"], "source": "manual"}
+
+    d = post_date(post)
+    visits = timeline_by_date.get(d) if d else None
+    if visits:
+        geo = geocoded.get(filename)
+        near = country_coords.get(get_country(post), [])
+        in_country = [
+            v for v in visits
+            if any(dist2(c[0], c[1], v[0], v[1]) < SAME_COUNTRY_DIST2 for c in near)
+        ]
+        if has_coords(geo):
+            # First visit at the minimum distance, as the browser's strict < scan
+            closest = min(visits, key=lambda v: dist2(geo["lat"], geo["lng"], v[0], v[1]))
+            if dist2(geo["lat"], geo["lng"], closest[0], closest[1]) < SAME_CITY_DIST2:
+                best = closest
+            elif in_country:
+                best = in_country[-1]
+            else:
+                return {"lat": geo["lat"], "lng": geo["lng"], "source": "geocoded", "flight_day": True}
+        else:
+            best = in_country[-1] if in_country else visits[-1]
+        return {"lat": best[0], "lng": best[1], "source": "timeline"}
+
+    geo = geocoded.get(filename)
+    if has_coords(geo):
+        return {"lat": geo["lat"], "lng": geo["lng"], "source": "geocoded"}
+    return None
+
+
+def resolve_locations(posts=None):
+    """{filename: resolution or None} for every travel post, in index order."""
+    if posts is None:
+        posts = load_json(INDEX_FILE, [])
+    manual = load_json(LOCATIONS_FILE, {}) or {}
+    geocoded = load_json(GEOCODED_FILE, {}) or {}
+    timeline_by_date = visits_by_date(load_json(TIMELINE_FILE, []) or [])
+
+    travel = [p for p in posts if is_travel(p)]
+    country_coords = country_geo_coords(travel, geocoded)
+    return {
+        p.get("filename") or "": resolve_post(p, manual, timeline_by_date, geocoded, country_coords)
+        for p in travel
+    }
+
+
+def main():
+    if not INDEX_FILE.exists():
+        print(f"[!] Index file not found: {INDEX_FILE}")
+        sys.exit(1)
+
+    resolved = resolve_locations()
+    content = json.dumps(resolved, indent=2, ensure_ascii=False) + "\n"
+    if not OUT_FILE.exists() or OUT_FILE.read_text(encoding="utf-8") != content:
+        OUT_FILE.write_text(content, encoding="utf-8")
+
+    counts = {}
+    for r in resolved.values():
+        source = r["source"] if r else "unresolved"
+        counts[source] = counts.get(source, 0) + 1
+    summary = ", ".join(f"{n} {source}" for source, n in sorted(counts.items()))
+    print(f"[+] Resolved {len(resolved)} travel posts ({summary or 'none'}) -> "
+          f"{OUT_FILE.relative_to(REPO_ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,28 +13,12 @@ import json
 from collections import defaultdict
 from pathlib import Path
 
-import yaml
+from post_corpus import load_posts
 
 POSTS_DIR = Path("posts")
 LOCATIONS_FILE = POSTS_DIR / "locations.json"
 
 
-def parse_frontmatter(filepath: Path):
-    try:
-        text = filepath.read_text(encoding="utf-8")
-    except Exception:
-        return {}
-    if not text.startswith("---"):
-        return {}
-    end = text.find("---", 3)
-    if end == -1:
-        return {}
-    try:
-        return yaml.safe_load(text[3:end]) or {}
-    except yaml.YAMLError:
-        return {}
-
-
 def normalize_list(value):
     if isinstance(value, str):
         return [v.strip() for v in value.split(",") if v.strip()]
@@ -57,12 +41,13 @@ def main():
 
     published = []
 
-    for filepath in sorted(POSTS_DIR.rglob("*.md")):
-        fm = parse_frontmatter(filepath)
+    for post in load_posts():
+        # Malformed frontmatter counts as unpublished here; check_health.py reports it
+        fm = post["frontmatter"] or {}
         uploadto = normalize_list(fm.get("uploadto", []))
         if "blog" not in [u.lower() for u in uploadto]:
             continue
-        rel = filepath.relative_to(POSTS_DIR).as_posix()
+        rel = post["rel"]
         categories = normalize_list(fm.get("categories", []))
         date = str(fm.get("date", "") or "")
         published.append({"rel": rel, "categories": categories, "date": date})
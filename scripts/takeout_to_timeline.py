@@ -3,25 +3,94 @@ Convert Google Maps Timeline export to posts/timeline.json.
 
 Input:  data/Timeline.json  (semanticSegments format, exported from
         Google Maps app -> Your Timeline -> Export)
+        or a raw Takeout Records.json ({"locations": [...]}, detected from
+        the file's first bytes or forced with --records)
 Output: posts/timeline.json — array of { lat, lng, date, timestamp, type }
 
 Point types:
   "visit" — level-0 place visits (primary location data, used to resolve
              post coordinates on the travel map)
-  "track" — one representative point per movement segment (shows path detail
-             on the map without overwhelming it)
+  "track" — points along movement segments' paths (route shape on the map)
+
+Records.json is streamed, never loaded whole: objects are decoded one at a
+time from a fixed-size read buffer, so memory stays flat for multi-GB
+exports. Raw fixes are downsampled as they stream past:
+  "visit" — the device stayed within STAY_RADIUS_M for STAY_MIN_S or more;
+             one point at the centroid, timestamped at arrival
+  "track" — a fix at least --min-interval seconds and --min-distance metres
+             from the last kept one (and the first fix of every day)
+Fixes reporting an accuracy worse than MAX_ACCURACY_M are dropped. Records
+timestamps are UTC, so "date" is the UTC date for this input.
+
+Before writing, new points are simplified (NumPy, vectorized per step):
+  - each day's track is reduced with Douglas–Peucker (--tolerance metres,
+    0 to disable), keeping route shape with a fraction of the points; for
+    semanticSegments input a day keeps at most one point per timelinePath
+    (the most significant ones, or the middle one when a day has a single
+    path), so the route never costs more points than one-per-path would
+  - visits on the same day within --cluster-radius metres of each other are
+    merged into one at their centroid, timestamped at the last of them (the
+    travel map treats a day's last visit as where the post was written)
+
+Several exports can be given at once; their points are combined and
+deduplicated by timestamp + position. With --merge the existing
+posts/timeline.json is kept and only data newer than its latest point is
+processed and merged in (a linear merge of two sorted lists, normally just
+an append), so a re-import costs in proportion to the new data and older
+history not in the new export is never lost.
+
+Alongside timeline.json it writes posts/timeline/ so the travel map never
+has to download all of history:
+  trip-<id>.json       points inside each trip's date range (trips are the
+                       first folder of travel posts, named via data/trips.json,
+                       spanning their first to last post date — as travel.js
+                       groups them)
+  month-YYYY-MM.json   every point, by calendar month (what the map reads to
+                       resolve posts missing from resolved_locations.json)
+  index.json           file, count, date range and [[south, west], [north,
+                       east]] bounds of each shard
+--shard-only rebuilds these from the existing timeline.json (e.g. after new
+posts extend a trip) without reading any export.
 
 Run from repo root:
   python scripts/takeout_to_timeline.py
+  python scripts/takeout_to_timeline.py data/takeout/Records.json
+  python scripts/takeout_to_timeline.py --merge data/takeout/Timeline-2025-*.json
 """
 
+import argparse
+import heapq
 import json
+import math
 import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
 from pathlib import Path
 
+import numpy as np
+
 REPO_ROOT = Path(__file__).resolve().parent.parent
 INPUT_FILE = REPO_ROOT / "data" / "takeout" / "Timeline.json"
 OUT_FILE = REPO_ROOT / "posts" / "timeline.json"
+SHARD_DIR = REPO_ROOT / "posts" / "timeline"
+POSTS_INDEX = REPO_ROOT / "posts" / "index.json"
+TRIPS_FILE = REPO_ROOT / "data" / "trips.json"
+
+# Records.json streaming / downsampling
+READ_CHUNK = 1 << 20
+TRACK_MIN_INTERVAL_S = 600
+TRACK_MIN_DISTANCE_M = 1000
+STAY_RADIUS_M = 200
+STAY_MIN_S = 1800
+MAX_ACCURACY_M = 500
+PROGRESS_EVERY = 1_000_000
+
+# Simplification
+SIMPLIFY_TOLERANCE_M = 50
+CLUSTER_RADIUS_M = 250
+EARTH_RADIUS_M = 6_371_000
 
 
 def parse_latlng(s):
@@ -42,10 +111,212 @@ def iso_date(ts):
     return m.group(1) if m else None
 
 
-def process(data):
+def parse_epoch(ts):
+    """Epoch seconds for an ISO timestamp; offset-less ones are taken as UTC."""
+    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def point_epoch(point):
+    return parse_epoch(point["timestamp"])
+
+
+def point_key(point):
+    """Identity for deduplication: same instant, same place."""
+    return round(point_epoch(point)), point["lat"], point["lng"]
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """Equirectangular approximation — plenty for thresholds of metres to km."""
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+def detect_format(path):
+    """"records" for a raw Records.json, else "segments"."""
+    with path.open("r", encoding="utf-8") as f:
+        head = f.read(4096)
+    return "records" if '"locations"' in head and '"semanticSegments"' not in head else "segments"
+
+
+def iter_array(path, key, counter=None):
+    """Yield the elements of the top-level array `key` one at a time.
+
+    Reads READ_CHUNK characters at a time and raw_decode()s each element
+    from the buffer, dropping consumed text, so memory is bounded by the
+    chunk size plus the largest single element. `counter["bytes"]` tracks
+    how much of the file has been read, for progress reporting.
+    """
+    decoder = json.JSONDecoder()
+    with path.open("r", encoding="utf-8") as f:
+        buf = ""
+        eof = False
+
+        def fill():
+            nonlocal buf, eof
+            chunk = f.read(READ_CHUNK)
+            if counter is not None:
+                counter["bytes"] += len(chunk)
+            eof = not chunk
+            buf += chunk
+            return not eof
+
+        # Find the start of the array
+        marker = f'"{key}"'
+        while True:
+            start = buf.find(marker)
+            if start != -1:
+                bracket = buf.find("[", start + len(marker))
+                if bracket != -1:
+                    buf = buf[bracket + 1:]
+                    break
+            else:
+                buf = buf[-len(marker):]
+            if not fill():
+                return
+
+        pos = 0
+        while True:
+            # Skip whitespace and separators between elements
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    break
+            if pos >= len(buf) or buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Element straddles the buffer end: compact, read more, retry
+                buf, pos = buf[pos:], 0
+                if not fill():
+                    raise
+                continue
+            yield item
+            pos = end
+            if pos > READ_CHUNK:
+                buf, pos = buf[pos:], 0
+
+
+def record_fix(rec):
+    """(lat, lng, epoch_s, iso_timestamp) for a Records.json location, or None."""
+    if "latitudeE7" not in rec or "longitudeE7" not in rec:
+        return None
+    if rec.get("accuracy", 0) > MAX_ACCURACY_M:
+        return None
+    lat = rec["latitudeE7"] / 1e7
+    lng = rec["longitudeE7"] / 1e7
+    # latitudeE7 wraps for southern/western fixes in some exports
+    if lat > 90:
+        lat -= 429.4967296
+    if lng > 180:
+        lng -= 429.4967296
+    ts = rec.get("timestamp")
+    try:
+        if ts:
+            epoch = parse_epoch(ts)
+        elif "timestampMs" in rec:
+            epoch = int(rec["timestampMs"]) / 1000
+            ts = datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="milliseconds")
+            ts = ts.replace("+00:00", "Z")
+        else:
+            return None
+    except (ValueError, OverflowError):
+        return None
+    return round(lat, 6), round(lng, 6), epoch, ts
+
+
+def downsample(fixes, min_interval=TRACK_MIN_INTERVAL_S, min_distance=TRACK_MIN_DISTANCE_M):
+    """Reduce a chronological stream of fixes to visit and track points.
+
+    Constant state: the last kept track point and the current stay candidate.
+    """
+    last = None          # (lat, lng, epoch, date) of the last kept track point
+    stay = None          # [lat_sum, lng_sum, n, first_fix, last_epoch]
+
+    def point(lat, lng, ts, kind):
+        return {"lat": lat, "lng": lng, "date": iso_date(ts), "timestamp": ts, "type": kind}
+
+    def close_stay():
+        lat_sum, lng_sum, n, first, last_epoch = stay
+        if last_epoch - first[2] >= STAY_MIN_S:
+            return point(round(lat_sum / n, 6), round(lng_sum / n, 6), first[3], "visit")
+        return None
+
+    for lat, lng, epoch, ts in fixes:
+        if stay and distance_m(stay[3][0], stay[3][1], lat, lng) <= STAY_RADIUS_M:
+            stay[0] += lat
+            stay[1] += lng
+            stay[2] += 1
+            stay[4] = epoch
+        else:
+            if stay:
+                visit = close_stay()
+                if visit:
+                    yield visit
+            stay = [lat, lng, 1, (lat, lng, epoch, ts), epoch]
+
+        date = iso_date(ts)
+        if (last is None or date != last[3]
+                or (epoch - last[2] >= min_interval
+                    and distance_m(last[0], last[1], lat, lng) >= min_distance)):
+            last = (lat, lng, epoch, date)
+            yield point(lat, lng, ts, "track")
+
+    if stay:
+        visit = close_stay()
+        if visit:
+            yield visit
+
+
+def process_records(path, min_interval=TRACK_MIN_INTERVAL_S, min_distance=TRACK_MIN_DISTANCE_M,
+                    since=None):
+    """Stream a Records.json into downsampled points, reporting throughput.
+    Fixes at or before `since` (epoch seconds) are skipped."""
+    counter = {"bytes": 0, "records": 0}
+    started = time.monotonic()
+    size = path.stat().st_size
+
+    def fixes():
+        for rec in iter_array(path, "locations", counter):
+            counter["records"] += 1
+            if counter["records"] % PROGRESS_EVERY == 0:
+                elapsed = time.monotonic() - started
+                print(f"  {counter['records']:,} records, {counter['bytes'] / 1e6:,.0f} of "
+                      f"{size / 1e6:,.0f} MB ({counter['records'] / elapsed:,.0f} rec/s)",
+                      file=sys.stderr)
+            fix = record_fix(rec)
+            if fix and (since is None or fix[2] > since):
+                yield fix
+
+    points = list(downsample(fixes(), min_interval, min_distance))
+    points.sort(key=point_epoch)
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    print(f"Streamed {counter['records']:,} records ({size / 1e6:,.1f} MB) in {elapsed:.1f}s: "
+          f"{counter['records'] / elapsed:,.0f} rec/s, {size / 1e6 / elapsed:,.1f} MB/s, "
+          f"kept {len(points):,} points")
+    return points
+
+
+def process(data, since=None):
+    """Points from a semanticSegments export; segments at or before `since`
+    (epoch seconds) are skipped."""
     points = []
 
-    for seg in data.get("semanticSegments", []):
+    def is_new(timestamp):
+        try:
+            return since is None or parse_epoch(timestamp) > since
+        except ValueError:
+            return False
+
+    for n, seg in enumerate(data.get("semanticSegments", [])):
+        if since is not None and seg.get("endTime") and not is_new(seg["endTime"]):
+            continue
 
         if "visit" in seg:
             visit = seg["visit"]
@@ -59,7 +330,7 @@ def process(data):
                 continue
             timestamp = seg.get("startTime", "")
             date = iso_date(timestamp)
-            if not date:
+            if not date or not is_new(timestamp):
                 continue
             points.append({
                 "lat": lat,
@@ -70,45 +341,324 @@ def process(data):
             })
 
         elif "timelinePath" in seg:
-            path = seg["timelinePath"]
-            if not path:
-                continue
-            # One representative point per movement segment (middle of the path)
-            mid = path[len(path) // 2]
-            lat, lng = parse_latlng(mid.get("point", ""))
-            if lat is None:
-                continue
-            timestamp = mid.get("time") or seg.get("startTime", "")
-            date = iso_date(timestamp)
-            if not date:
-                continue
-            points.append({
-                "lat": lat,
-                "lng": lng,
-                "date": date,
-                "timestamp": timestamp,
-                "type": "track",
-            })
+            # Every path point; simplify() thins them to the route's shape,
+            # at most one per path ("path" is dropped there)
+            for step in seg["timelinePath"]:
+                lat, lng = parse_latlng(step.get("point", ""))
+                if lat is None:
+                    continue
+                timestamp = step.get("time") or seg.get("startTime", "")
+                date = iso_date(timestamp)
+                if not date or not is_new(timestamp):
+                    continue
+                points.append({
+                    "lat": lat,
+                    "lng": lng,
+                    "date": date,
+                    "timestamp": timestamp,
+                    "type": "track",
+                    "path": n,
+                })
 
         # "activity" segments have no location data — skip
 
-    points.sort(key=lambda p: p.get("timestamp", ""))
+    points.sort(key=point_epoch)
     return points
 
 
+def to_xy(lat, lng):
+    """Project degrees onto a local equirectangular plane in metres."""
+    lat0 = np.radians(lat.mean())
+    return np.column_stack((np.radians(lng) * np.cos(lat0), np.radians(lat))) * EARTH_RADIUS_M
+
+
+def douglas_peucker(xy, tolerance, max_points=None):
+    """Boolean keep-mask for the points of an (n, 2) polyline.
+
+    Iterative (no recursion limit on long days); each step measures every
+    point of a span against its chord in one vectorized pass, using distance
+    to the segment rather than the infinite line so out-and-back loops stay.
+    Spans are split farthest-point first, so with `max_points` the budget
+    goes to the largest deviations; below 2 only the middle point is kept.
+    """
+    n = len(xy)
+    keep = np.zeros(n, dtype=bool)
+    if max_points is not None and max_points < 2:
+        keep[n // 2] = True
+        return keep
+    keep[0] = keep[-1] = True
+    kept = 2
+
+    def split(i, j):
+        if j - i < 2:
+            return
+        a, chord = xy[i], xy[j] - xy[i]
+        rel = xy[i + 1:j] - a
+        length2 = chord @ chord
+        t = np.clip(rel @ chord / length2, 0, 1) if length2 else np.zeros(len(rel))
+        dist = np.hypot(*(rel - t[:, None] * chord).T)
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            heapq.heappush(spans, (-dist[k], i, i + 1 + k, j))
+
+    spans = []
+    split(0, n - 1)
+    while spans and (max_points is None or kept < max_points):
+        _, i, mid, j = heapq.heappop(spans)
+        keep[mid] = True
+        kept += 1
+        split(i, mid)
+        split(mid, j)
+    return keep
+
+
+def by_day(points):
+    """Group consecutive points (already sorted) by their date."""
+    groups = {}
+    for point in points:
+        groups.setdefault(point["date"], []).append(point)
+    return groups.values()
+
+
+def simplify_tracks(tracks, tolerance):
+    """Douglas–Peucker each day's track. Points tagged with the timelinePath
+    they came from are capped at one per path whose middle point falls on
+    that day (the tag is dropped); Records.json fixes carry no tag and no cap."""
+    by_path = {}
+    for point in tracks:
+        if "path" in point:
+            by_path.setdefault(point["path"], []).append(point)
+    budgets = Counter(path[len(path) // 2]["date"] for path in by_path.values())
+    kept = []
+    for day in by_day(tracks):
+        budget = budgets[day[0]["date"]] if any("path" in p for p in day) else None
+        if tolerance <= 0 or (len(day) < 3 and (budget is None or len(day) <= budget)):
+            mask = [True] * len(day)
+        elif budget == 0:
+            mask = [False] * len(day)
+        else:
+            coords = np.array([(p["lat"], p["lng"]) for p in day])
+            mask = douglas_peucker(to_xy(coords[:, 0], coords[:, 1]), tolerance, budget)
+        kept += [{k: v for k, v in p.items() if k != "path"} for p, keep in zip(day, mask) if keep]
+    return kept
+
+
+def cluster_visits(visits, radius):
+    """Merge each day's visits that lie within `radius` metres of the first
+    unassigned visit of their group (in time order)."""
+    merged = []
+    for day in by_day(visits):
+        if len(day) < 2 or radius <= 0:
+            merged += day
+            continue
+        coords = np.array([(p["lat"], p["lng"]) for p in day])
+        xy = to_xy(coords[:, 0], coords[:, 1])
+        close = np.hypot(*(xy[:, None, :] - xy[None, :, :]).transpose(2, 0, 1)) <= radius
+        unassigned = np.ones(len(day), dtype=bool)
+        for i in range(len(day)):
+            if not unassigned[i]:
+                continue
+            members = np.flatnonzero(close[i] & unassigned)
+            unassigned[members] = False
+            lat, lng = coords[members].mean(axis=0)
+            last = day[members[-1]]
+            merged.append({**last, "lat": round(float(lat), 6), "lng": round(float(lng), 6)})
+    merged.sort(key=point_epoch)
+    return merged
+
+
+def simplify(points, tolerance=SIMPLIFY_TOLERANCE_M, radius=CLUSTER_RADIUS_M):
+    """Douglas–Peucker each day's track and cluster each day's visits; the
+    two sorted streams are merged back together."""
+    tracks = simplify_tracks([p for p in points if p["type"] == "track"], tolerance)
+    visits = cluster_visits([p for p in points if p["type"] == "visit"], radius)
+    return list(heapq.merge(visits, tracks, key=point_epoch))
+
+
+def dedupe(points):
+    """Drop repeats of the same timestamp + position, keeping the first."""
+    seen = set()
+    unique = []
+    for point in points:
+        key = point_key(point)
+        if key not in seen:
+            seen.add(key)
+            unique.append(point)
+    return unique
+
+
+def overlap_start(points, epoch):
+    """Index of the first point in the sorted tail at or after `epoch`,
+    scanning backwards so the cost is the size of the overlap."""
+    i = len(points)
+    while i > 0 and point_epoch(points[i - 1]) >= epoch:
+        i -= 1
+    return i
+
+
+def merge_points(existing, new):
+    """Merge sorted `new` into sorted `existing`; return (merged, added).
+
+    Only the tail of `existing` that overlaps `new` is checked for
+    duplicates, and when everything new is later (the usual re-import) the
+    merge is an append.
+    """
+    if not new:
+        return existing, 0
+    start = overlap_start(existing, point_epoch(new[0]))
+    seen = {point_key(p) for p in existing[start:]}
+    fresh = [p for p in new if point_key(p) not in seen]
+    if start == len(existing):
+        return existing + fresh, len(fresh)
+    return existing[:start] + list(heapq.merge(existing[start:], fresh, key=point_epoch)), len(fresh)
+
+
+def load_existing():
+    if not OUT_FILE.exists():
+        return []
+    with OUT_FILE.open("r", encoding="utf-8") as f:
+        points = json.load(f)
+    return points if isinstance(points, list) else []
+
+
+def write_timeline(points):
+    """Write timeline.json if its content changed; return whether it did."""
+    content = json.dumps(points, indent=2, ensure_ascii=False)
+    if OUT_FILE.exists() and OUT_FILE.read_text(encoding="utf-8") == content:
+        return False
+    OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    OUT_FILE.write_text(content, encoding="utf-8")
+    return True
+
+
+def trip_ranges():
+    """[(id, name, first_date, last_date)] for each trip root of the travel posts."""
+    try:
+        posts = json.loads(POSTS_INDEX.read_text(encoding="utf-8"))
+        config = json.loads(TRIPS_FILE.read_text(encoding="utf-8")) if TRIPS_FILE.exists() else []
+    except (OSError, ValueError):
+        return []
+    by_root = {t["root"]: t for t in config if t.get("root")}
+    dates = {}
+    for post in posts:
+        if not any(str(c).strip().lower() == "travel" for c in post.get("categories") or []):
+            continue
+        date = (post.get("date") or "").split(" ")[0]
+        root = post["filename"].split("/")[0]
+        if date and "/" in post["filename"]:
+            dates.setdefault(root, []).append(date)
+    trips = []
+    for root, days in dates.items():
+        cfg = by_root.get(root, {})
+        trip_id = cfg.get("id") or re.sub(r"\s+", "-", root.lower())
+        trips.append((trip_id, cfg.get("name") or root.lower(), min(days), max(days)))
+    return sorted(trips, key=lambda t: t[2])
+
+
+def shard_info(file, points):
+    lats = [p["lat"] for p in points]
+    lngs = [p["lng"] for p in points]
+    return {
+        "file": file,
+        "count": len(points),
+        "start": points[0]["date"],
+        "end": points[-1]["date"],
+        "bounds": [[min(lats), min(lngs)], [max(lats), max(lngs)]],
+    }
+
+
+def write_shards(points):
+    """Write posts/timeline/ trip and month shards plus index.json; return
+    how many files changed."""
+    files = {}
+    index = {"total": len(points), "trips": [], "months": []}
+
+    for trip_id, name, first, last in trip_ranges():
+        members = [p for p in points if first <= p["date"] <= last]
+        if not members:
+            continue
+        file = f"trip-{trip_id}.json"
+        files[file] = members
+        index["trips"].append({"id": trip_id, "name": name, **shard_info(file, members)})
+
+    months = {}
+    for point in points:
+        months.setdefault(point["date"][:7], []).append(point)
+    for month, members in sorted(months.items()):
+        file = f"month-{month}.json"
+        files[file] = members
+        index["months"].append({"month": month, **shard_info(file, members)})
+    files["index.json"] = index
+
+    SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    changed = 0
+    for name, data in files.items():
+        path = SHARD_DIR / name
+        content = json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n"
+        if not path.exists() or path.read_text(encoding="utf-8") != content:
+            path.write_text(content, encoding="utf-8")
+            changed += 1
+    for path in SHARD_DIR.glob("*.json"):
+        if path.name not in files:
+            path.unlink()
+            changed += 1
+    print(f"Shards: {len(index['trips'])} trip(s), {len(index['months'])} month(s) in "
+          f"{SHARD_DIR.relative_to(REPO_ROOT)} ({changed} file(s) changed)")
+    return changed
+
+
 def main():
-    if not INPUT_FILE.exists():
-        print(f"Input not found: {INPUT_FILE}")
+    parser = argparse.ArgumentParser(description="Convert a Google Timeline export to posts/timeline.json.")
+    parser.add_argument("inputs", nargs="*", type=Path, default=[INPUT_FILE], metavar="input",
+                        help=f"Timeline.json or Records.json exports (default {INPUT_FILE.relative_to(REPO_ROOT)})")
+    parser.add_argument("--records", action="store_true",
+                        help="treat input as a raw Records.json (normally detected)")
+    parser.add_argument("--min-interval", type=float, default=TRACK_MIN_INTERVAL_S, metavar="S",
+                        help=f"Records.json: seconds between kept track points (default {TRACK_MIN_INTERVAL_S})")
+    parser.add_argument("--min-distance", type=float, default=TRACK_MIN_DISTANCE_M, metavar="M",
+                        help=f"Records.json: metres between kept track points (default {TRACK_MIN_DISTANCE_M})")
+    parser.add_argument("--tolerance", type=float, default=SIMPLIFY_TOLERANCE_M, metavar="M",
+                        help=f"Douglas–Peucker tolerance for tracks in metres (default {SIMPLIFY_TOLERANCE_M}, 0 = off)")
+    parser.add_argument("--cluster-radius", type=float, default=CLUSTER_RADIUS_M, metavar="M",
+                        help=f"merge same-day visits this close, in metres (default {CLUSTER_RADIUS_M}, 0 = off)")
+    parser.add_argument("--merge", action="store_true",
+                        help="keep the existing output and merge in only newer points")
+    parser.add_argument("--shard-only", action="store_true",
+                        help="only rebuild posts/timeline/ from the existing timeline.json")
+    args = parser.parse_args()
+
+    if args.shard_only:
+        write_shards(load_existing())
         return
 
-    with INPUT_FILE.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    missing = [path for path in args.inputs if not path.exists()]
+    if missing:
+        print(f"Input not found: {', '.join(map(str, missing))}")
+        return
 
-    points = process(data)
+    existing = load_existing() if args.merge else []
+    since = point_epoch(existing[-1]) if existing else None
+    if since is not None:
+        print(f"Merging into {len(existing)} existing points (latest {existing[-1]['timestamp']})")
 
-    OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with OUT_FILE.open("w", encoding="utf-8") as f:
-        json.dump(points, f, indent=2, ensure_ascii=False)
+    per_export = []
+    for path in args.inputs:
+        if args.records or detect_format(path) == "records":
+            per_export.append(process_records(path, args.min_interval, args.min_distance, since))
+        else:
+            with path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            per_export.append(process(data, since))
+    # Each export comes back sorted, so combining them is a merge too
+    new = list(heapq.merge(*per_export, key=point_epoch))
+    unique = dedupe(new)
+    simplified = simplify(unique, args.tolerance, args.cluster_radius)
+    points, added = merge_points(existing, simplified)
+    print(f"{len(new)} new points from {len(args.inputs)} export(s): "
+          f"{len(new) - len(unique)} duplicate(s), simplified to {len(simplified)}, {added} added")
+
+    write_timeline(points)
+    write_shards(points)
 
     visits = sum(1 for p in points if p["type"] == "visit")
     tracks = sum(1 for p in points if p["type"] == "track")
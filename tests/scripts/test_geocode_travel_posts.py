@@ -0,0 +1,204 @@
+"""geocode_travel_posts.py against an in-process Nominatim stand-in.
+
+Each test runs main() with --backend http pointed at a local /search server
+on an ephemeral port, with posts/index.json, the timeline and .cache/
+redirected to a temp directory, and checks what was asked and what was
+written.
+
+Run from repo root:
+  python -m unittest discover tests/scripts
+"""
+import contextlib
+import http.server
+import io
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+import geocode_travel_posts as geo  # noqa: E402
+
+PLACES = {"hanoi": (21.0285, 105.8542), "hue": (16.4637, 107.5909), "pai": (19.3583, 98.4378)}
+
+
+class StandIn:
+    """Nominatim-shaped /search answering from PLACES. Records every query;
+    `status` forces an HTTP error for a query, `on_request(n)` runs before
+    the n-th answer."""
+
+    def __init__(self):
+        self.queries = []
+        self.status = {}
+        self.on_request = None
+        stand_in = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+                query = params.get("q", [""])[0]
+                stand_in.queries.append(query)
+                if stand_in.on_request:
+                    stand_in.on_request(len(stand_in.queries))
+                if query in stand_in.status:
+                    self.send_error(stand_in.status[query])
+                    return
+                hit = PLACES.get(query.split(",")[0].strip().lower())
+                body = json.dumps([{"lat": str(hit[0]), "lon": str(hit[1])}] if hit else [])
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def travel_post(name, date="2024-03-01"):
+    return {"filename": f"Polarsteps/Vietnam/{name}.md", "date": date, "categories": ["travel"]}
+
+
+class GeocodeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.out = self.dir / "geocoded.json"
+        self.stand_in = StandIn()
+        self.addCleanup(self.stand_in.close)
+        for name, value in (("INDEX_FILE", self.dir / "index.json"),
+                            ("TIMELINE_FILE", self.dir / "timeline.json"),
+                            ("CACHE_DIR", self.dir / "cache")):
+            patcher = mock.patch.object(geo, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(signal.signal, signal.SIGTERM, signal.getsignal(signal.SIGTERM))
+
+    def write_index(self, posts):
+        (self.dir / "index.json").write_text(json.dumps(posts), encoding="utf-8")
+
+    def run_main(self, *extra):
+        argv = ["geocode_travel_posts.py", "--backend", "http", "--url", self.stand_in.url,
+                "--out", str(self.out), *extra]
+        with mock.patch.object(sys, "argv", argv), contextlib.redirect_stdout(io.StringIO()):
+            geo.main()
+
+    def cache(self):
+        return json.loads(geo.query_cache_file("http").read_text(encoding="utf-8"))
+
+    def results(self):
+        return json.loads(self.out.read_text(encoding="utf-8"))
+
+    def test_hits_are_cached(self):
+        self.write_index([travel_post("1_hanoi"), travel_post("2_hue")])
+        self.run_main()
+        self.assertEqual(self.stand_in.queries, ["hanoi, Vietnam", "hue, Vietnam"])
+        self.assertEqual(self.results()["Polarsteps/Vietnam/1_hanoi.md"]["lat"], PLACES["hanoi"][0])
+
+        # A new post with a known place name costs no request
+        self.write_index([travel_post("1_hanoi"), travel_post("2_hue"), travel_post("3_hanoi")])
+        self.run_main()
+        self.assertEqual(len(self.stand_in.queries), 2)
+        self.assertEqual(self.results()["Polarsteps/Vietnam/3_hanoi.md"]["lng"], PLACES["hanoi"][1])
+
+    def test_miss_falls_back_to_country_and_is_cached(self):
+        self.write_index([travel_post("1_nowhere")])
+        self.run_main()
+        self.assertEqual(self.stand_in.queries, ["nowhere, Vietnam", "Vietnam"])
+        self.assertIsNone(self.results()["Polarsteps/Vietnam/1_nowhere.md"])
+        entry = self.cache()["nowhere, Vietnam|vn"]
+        self.assertEqual((entry["lat"], entry["misses"]), (None, 1))
+
+        # Still inside the retry window: not asked again
+        self.run_main()
+        self.assertEqual(len(self.stand_in.queries), 2)
+
+    def test_expired_miss_is_asked_again(self):
+        self.write_index([travel_post("1_hanoi")])
+        stale = int(time.time()) - geo.retry_after(1) - 60
+        geo.write_json_atomic(geo.query_cache_file("http"), {
+            "hanoi, Vietnam|vn": {"lat": None, "lng": None, "query": "hanoi, Vietnam", "at": stale, "misses": 1},
+        }, indent=1)
+        self.run_main()
+        self.assertEqual(self.stand_in.queries, ["hanoi, Vietnam"])
+        self.assertEqual(self.cache()["hanoi, Vietnam|vn"]["misses"], 0)
+        self.assertEqual(self.results()["Polarsteps/Vietnam/1_hanoi.md"]["lat"], PLACES["hanoi"][0])
+
+    def test_repeated_misses_back_off(self):
+        now = int(time.time())
+        self.assertEqual(geo.retry_after(2), 2 * geo.retry_after(1))
+        self.assertEqual(geo.retry_after(50), geo.MAX_RETRY_AFTER_S)
+        entry = {"lat": None, "at": now - geo.retry_after(1) - 60, "misses": 2}
+        self.assertTrue(geo.is_fresh(entry, now))
+        self.assertFalse(geo.is_fresh({**entry, "misses": 1}, now))
+
+    def test_rate_limited_request_is_not_cached(self):
+        self.write_index([travel_post("1_hanoi")])
+        self.stand_in.status["hanoi, Vietnam"] = 429
+        self.run_main()
+        self.assertIsNone(self.results()["Polarsteps/Vietnam/1_hanoi.md"])
+        self.assertNotIn("hanoi, Vietnam|vn", self.cache())
+
+        del self.stand_in.status["hanoi, Vietnam"]
+        self.run_main()
+        self.assertEqual(self.stand_in.queries, ["hanoi, Vietnam", "hanoi, Vietnam"])
+        self.assertEqual(self.results()["Polarsteps/Vietnam/1_hanoi.md"]["lat"], PLACES["hanoi"][0])
+
+    def test_sigterm_checkpoints_and_the_next_run_resumes(self):
+        names = ["1_hanoi", "2_hue", "3_pai", "4_hanoi_old"]
+        self.write_index([travel_post(name) for name in names])
+
+        def terminate(n):
+            if n == 3:
+                os.kill(os.getpid(), signal.SIGTERM)
+        self.stand_in.on_request = terminate
+
+        with self.assertRaises(SystemExit) as stopped:
+            self.run_main()
+        self.assertEqual(stopped.exception.code, 128 + signal.SIGTERM)
+        # Both files were checkpointed whole, with the answers received so far
+        done = self.results()
+        self.assertEqual(sorted(fn for fn, v in done.items() if v), [travel_post(n)["filename"] for n in names[:2]])
+        self.assertEqual(set(self.cache()), {"hanoi, Vietnam|vn", "hue, Vietnam|vn"})
+        self.assertFalse(list(self.dir.rglob("*.tmp")))
+
+        self.stand_in.on_request = None
+        asked = len(self.stand_in.queries)
+        self.run_main()
+        self.assertEqual(self.stand_in.queries[asked:], ["pai, Vietnam", "hanoi old, Vietnam", "Vietnam"])
+        self.assertTrue(all(self.results()[travel_post(n)["filename"]] for n in names[:3]))
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_paces_to_the_rate(self):
+        bucket = geo.TokenBucket(rate=50)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # The first token is free, the other five wait 1/50 s each
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 50 * 0.9)
+
+    def test_unlimited_never_waits(self):
+        bucket = geo.TokenBucket(rate=None)
+        with mock.patch.object(geo.time, "sleep") as sleep:
+            for _ in range(100):
+                bucket.acquire()
+        sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
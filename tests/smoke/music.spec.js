@@ -102,3 +102,23 @@ test("vinyl shelf renders from data and hides without it", async ({ page }) => {
   expect(gridOverflow).toBe("auto");
   expect(errors).toEqual([]);
 });
+
+test("vinyl shelf prefers mirrored cover thumbnails", async ({ page }) => {
+  const errors = await phosphorPage(page);
+  await page.route("https://tbd-spotify.tomerno6.workers.dev/**", (r) => r.abort());
+  const thumb = {
+    hash: "abc", w: 600, h: 590, color: "#203040",
+    variants: [{ w: 160, path: "assets/covers/abc.160.webp" }, { w: 320, path: "assets/covers/abc.320.webp" }],
+  };
+  await page.route("**/data/discogs.json", (r) =>
+    r.fulfill({ json: [{ ...MOCK_VINYL[0], cover: "https://i.discogs.com/x.jpeg", thumb }, MOCK_VINYL[1]] })
+  );
+  await page.route("**/assets/covers/**", (r) => r.fulfill({ status: 404, body: "" }));
+  await page.goto("/music.html", { waitUntil: "domcontentloaded" });
+  await page.waitForSelector(".vinyl-card");
+  const img = page.locator(".vinyl-card", { hasText: "In Rainbows" }).locator("img");
+  await expect(img).toHaveAttribute("src", "assets/covers/abc.160.webp");
+  await expect(img).toHaveAttribute("srcset", /abc\.320\.webp 320w/);
+  await expect(img).toHaveAttribute("height", "590");
+  expect(errors).toEqual([]);
+});